@@ -1,18 +1,98 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.models import DELETION, LogEntry
+from django.contrib.admin.options import get_content_type_for_model
+from django.db import transaction
+from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import render
+from typing import List
+
+from .bulk import rename_tag
 from .models import Post, Tag, Comment
 
 
+class MergeTagsForm(forms.Form):
+    target = forms.ModelChoiceField(queryset=Tag.objects.none(), label='Объединить в тег')
+
+    def __init__(self, *args, tags: QuerySet = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.fields['target'].queryset = tags
+
+
+class RenameTagForm(forms.Form):
+    title = forms.CharField(max_length=50, label='Заголовок')
+    slug = forms.SlugField(max_length=50, label='URL')
+
+    def __init__(self, *args, tag: Tag = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.tag = tag
+
+    def clean_slug(self) -> str:
+        slug: str = self.cleaned_data['slug'].lower()
+        if Tag.objects.filter(slug__iexact=slug).exclude(pk=self.tag.pk).exists():
+            raise forms.ValidationError('Тег с таким URL уже существует.')
+        return slug
+
+
+def deletion_entries(request: HttpRequest, queryset: QuerySet) -> List[LogEntry]:
+    """
+    Builds the admin log entries of objects about to be deleted in bulk,
+    which bypasses the per-object logging of the delete_selected action.
+    """
+    content_type_id: int = get_content_type_for_model(queryset.model).pk
+    return [
+        LogEntry(
+            user_id=request.user.pk, content_type_id=content_type_id, object_id=str(obj.pk),
+            object_repr=str(obj)[:200], action_flag=DELETION, change_message='',
+        )
+        for obj in queryset.only('title')
+    ]
+
+
+def render_bulk_action(request: HttpRequest, modeladmin: admin.ModelAdmin, queryset: QuerySet,
+                       action: str, title: str, form: forms.Form) -> HttpResponse:
+    """
+    Renders the intermediate page of an admin action that needs extra input.
+    """
+    return render(request, 'admin/blog/tag/bulk_action.html', context={
+        **modeladmin.admin_site.each_context(request),
+        'title': title,
+        'action': action,
+        'form': form,
+        'queryset': queryset,
+        'opts': modeladmin.model._meta,
+        'action_checkbox_name': admin.helpers.ACTION_CHECKBOX_NAME,
+    })
+
+
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug', 'date_pub', 'tags_list')
     list_display_links = ('title', 'slug')
     search_fields = ('title', 'body')
+    actions = ('bulk_delete',)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
 
     def tags_list(self, obj):
         return ", ".join([tag.title for tag in obj.tags.all()])
 
     tags_list.short_description = "Теги"
 
+    @admin.action(description='Удалить выбранные посты', permissions=['delete'])
+    def bulk_delete(self, request: HttpRequest, queryset: QuerySet) -> None:
+        with transaction.atomic():
+            entries = deletion_entries(request, queryset)
+            deleted = queryset.bulk_delete()
+            LogEntry.objects.bulk_create(entries)
+        self.message_user(
+            request, f'Удалено постов: {deleted["posts"]}, комментариев: {deleted["comments"]}.',
+            messages.SUCCESS)
+
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
@@ -25,3 +105,59 @@ class TagAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug')
     list_display_links = ('title', 'slug')
     search_fields = ('title',)
+    actions = ('bulk_delete', 'merge', 'rename')
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    @admin.action(description='Удалить выбранные теги', permissions=['delete'])
+    def bulk_delete(self, request: HttpRequest, queryset: QuerySet) -> None:
+        with transaction.atomic():
+            entries = deletion_entries(request, queryset)
+            deleted = queryset.bulk_delete()
+            LogEntry.objects.bulk_create(entries)
+        self.message_user(
+            request, f'Удалено тегов: {deleted["tags"]}, связей с постами: {deleted["links"]}.',
+            messages.SUCCESS)
+
+    @admin.action(description='Объединить выбранные теги', permissions=['change', 'delete'])
+    def merge(self, request: HttpRequest, queryset: QuerySet):
+        if queryset.count() < 2:
+            self.message_user(request, 'Выберите хотя бы два тега.', messages.WARNING)
+            return None
+
+        form = MergeTagsForm(request.POST if 'apply' in request.POST else None, tags=queryset)
+        if form.is_valid():
+            target: Tag = form.cleaned_data['target']
+            with transaction.atomic():
+                entries = deletion_entries(request, queryset.exclude(pk=target.pk))
+                merged = queryset.merge_into(target)
+                LogEntry.objects.bulk_create(entries)
+                merged_titles: str = ', '.join(entry.object_repr for entry in entries)
+                self.log_change(request, target, f'Объединены теги: {merged_titles}.')
+            self.message_user(
+                request, f'Объединено тегов: {merged["tags"]}, '
+                         f'перенесено связей с постами: {merged["links"]}.',
+                messages.SUCCESS)
+            return None
+        return render_bulk_action(request, self, queryset, 'merge', 'Объединение тегов', form)
+
+    @admin.action(description='Переименовать тег', permissions=['change'])
+    def rename(self, request: HttpRequest, queryset: QuerySet):
+        if queryset.count() != 1:
+            self.message_user(request, 'Выберите ровно один тег.', messages.WARNING)
+            return None
+
+        tag: Tag = queryset.get()
+        if 'apply' in request.POST:
+            form = RenameTagForm(request.POST, tag=tag)
+        else:
+            form = RenameTagForm(initial={'title': tag.title, 'slug': tag.slug}, tag=tag)
+        if form.is_valid():
+            rename_tag(tag, form.cleaned_data['title'], form.cleaned_data['slug'])
+            self.log_change(request, tag, [{'changed': {'fields': ['title', 'slug']}}])
+            self.message_user(request, f'Тег переименован в «{tag.title}».', messages.SUCCESS)
+            return None
+        return render_bulk_action(request, self, queryset, 'rename', 'Переименование тега', form)
@@ -0,0 +1,348 @@
+"""
+Read-only JSON API for posts, tags and comments.
+
+Every list endpoint supports sparse fieldsets (``?fields=title,slug``),
+which limit the selected columns, cursor pagination (``?cursor=``,
+``?limit=``) and conditional GET through ETags. List pages are streamed
+item by item, so memory use does not grow with the page size.
+"""
+import base64
+import hashlib
+import json
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import reverse
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import condition, require_GET
+
+from .caching import CONTENT_FAMILY, family_version
+from .models import Comment, Post, Tag
+
+
+DEFAULT_LIMIT: int = 20
+MAX_LIMIT: int = 100
+CHUNK_SIZE: int = 100
+
+# Cursor values have to fit into a signed 64-bit integer column.
+MAX_ID: int = 2 ** 63 - 1
+
+
+class ApiError(Exception):
+    """
+    An invalid API request, answered with 400 Bad Request.
+    """
+    status: int = 400
+
+
+class ApiNotFound(ApiError):
+    """
+    A request for an object that does not exist, answered with 404 Not Found.
+    """
+    status: int = 404
+
+
+class Field:
+    """
+    An output field of a resource.
+
+    Attributes:
+        column (str): The column selected from the database.
+        convert (Callable): Turns the column value into the output value.
+    """
+
+    def __init__(self, column: str, convert: Optional[Callable[[Any], Any]] = None) -> None:
+        self.column = column
+        self.convert = convert
+
+    def value(self, row: dict) -> Any:
+        value: Any = row[self.column]
+        if self.convert is not None and value is not None:
+            return self.convert(value)
+        return value
+
+
+def media_url(name: str) -> Optional[str]:
+    return default_storage.url(name) if name else None
+
+
+class Resource:
+    """
+    A read-only collection of model objects.
+
+    Attributes:
+        fields (Dict[str, Field]): The fields that can be requested.
+        default_fields (Sequence[str]): The fields returned without `?fields=`.
+        order_field (str): The field the cursor paginates by, ties are broken by pk.
+        order_type (type): The type of the order field, `int` or `datetime`.
+        descending (bool): Whether newer, i.e. larger, values come first.
+    """
+    fields: Dict[str, Field] = {}
+    default_fields: Sequence[str] = ()
+    order_field: str = 'pk'
+    order_type: type = int
+    descending: bool = False
+
+    def get_queryset(self, request: HttpRequest, **kwargs: Any) -> QuerySet:
+        raise NotImplementedError
+
+    def parse_fields(self, request: HttpRequest, default: Sequence[str]) -> List[str]:
+        """
+        Returns the requested field names, validated against the resource.
+        """
+        raw: str = request.GET.get('fields', '')
+        names: List[str] = [name.strip() for name in raw.split(',') if name.strip()] or list(default)
+        unknown: List[str] = [name for name in names if name not in self.fields and name not in self.extra_fields()]
+        if unknown:
+            raise ApiError(f'Unknown fields: {", ".join(unknown)}. '
+                           f'Available: {", ".join(list(self.fields) + self.extra_fields())}.')
+        return names
+
+    def extra_fields(self) -> List[str]:
+        """
+        Returns the names of fields that are not plain columns.
+        """
+        return []
+
+    def columns(self, names: Sequence[str]) -> List[str]:
+        """
+        Returns the columns to select for the given fields.
+        """
+        columns: List[str] = ['pk', self.order_field]
+        columns += [self.fields[name].column for name in names if name in self.fields]
+        return list(dict.fromkeys(columns))
+
+    def serialize(self, row: dict, names: Sequence[str]) -> dict:
+        return {name: self.fields[name].value(row) for name in names if name in self.fields}
+
+    def attach_extra(self, items: List[Tuple[dict, dict]], names: Sequence[str]) -> None:
+        """
+        Adds non-column fields to a chunk of serialized items.
+        """
+
+    def paginate(self, queryset: QuerySet, cursor: Optional[str]) -> QuerySet:
+        """
+        Orders the queryset and skips everything up to and including the cursor.
+        """
+        prefix: str = '-' if self.descending else ''
+        ordering: List[str] = [f'{prefix}{self.order_field}', f'{prefix}pk']
+        if self.order_field == 'pk':
+            ordering = ordering[:1]
+        if cursor:
+            value, pk = decode_cursor(cursor, self.order_type)
+            lookup: str = 'lt' if self.descending else 'gt'
+            after: Q = Q(**{f'pk__{lookup}': pk})
+            if self.order_field != 'pk':
+                after = Q(**{f'{self.order_field}__{lookup}': value}) | (
+                    Q(**{self.order_field: value}) & after)
+            queryset = queryset.filter(after)
+        return queryset.order_by(*ordering)
+
+    def stream(self, queryset: QuerySet, names: Sequence[str], limit: int) -> Iterator[str]:
+        """
+        Yields the JSON document of one page, one item at a time.
+        """
+        encoder = DjangoJSONEncoder()
+        rows: Iterator[dict] = queryset.values(*self.columns(names))[:limit + 1].iterator(
+            chunk_size=CHUNK_SIZE)
+
+        yield '{"results": ['
+        sent: int = 0
+        last: Optional[dict] = None
+        has_next: bool = False
+        while True:
+            chunk: List[dict] = list(islice(rows, CHUNK_SIZE))
+            if sent + len(chunk) > limit:
+                chunk = chunk[:limit - sent]
+                has_next = True
+            if not chunk:
+                break
+            items: List[Tuple[dict, dict]] = [(row, self.serialize(row, names)) for row in chunk]
+            self.attach_extra(items, names)
+            for row, item in items:
+                yield (', ' if sent else '') + encoder.encode(item)
+                sent += 1
+                last = row
+            if has_next:
+                break
+
+        next_cursor: Optional[str] = None
+        if has_next and last is not None:
+            next_cursor = encode_cursor(last[self.order_field], last['pk'])
+        yield '], "next": ' + encoder.encode(next_cursor) + '}'
+
+
+def encode_cursor(value: Any, pk: int) -> str:
+    # Datetimes keep their microseconds, which DjangoJSONEncoder would cut off.
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    payload: str = json.dumps([value, pk], cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def is_id(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= MAX_ID
+
+
+def decode_cursor(cursor: str, order_type: type = int) -> Tuple[Any, int]:
+    """
+    Returns the order value and the pk stored in a cursor.
+
+    Cursors come from clients, so both are checked before they reach a
+    query: the pk has to be an integer and the value of `order_type`.
+    """
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ApiError('Invalid cursor.')
+    if not is_id(pk):
+        raise ApiError('Invalid cursor.')
+
+    if order_type is datetime:
+        value = parse_datetime(value) if isinstance(value, str) else None
+        # Cursors are encoded from aware datetimes, so a naive one is forged.
+        if value is None or value.tzinfo is None:
+            raise ApiError('Invalid cursor.')
+    elif not is_id(value):
+        raise ApiError('Invalid cursor.')
+    return value, pk
+
+
+class PostResource(Resource):
+    fields: Dict[str, Field] = {
+        'id': Field('pk'),
+        'title': Field('title'),
+        'slug': Field('slug'),
+        'url': Field('slug', lambda slug: reverse('post_detail_url', kwargs={'slug': slug})),
+        'excerpt': Field('excerpt'),
+        'word_count': Field('word_count'),
+        'date_pub': Field('date_pub'),
+        'image': Field('image', media_url),
+        'image_width': Field('image_width'),
+        'image_height': Field('image_height'),
+        'body_html': Field('body_html'),
+    }
+    default_fields: Sequence[str] = ('id', 'title', 'slug', 'url', 'excerpt', 'date_pub', 'tags')
+    detail_fields: Sequence[str] = default_fields + ('image', 'body_html')
+    order_field: str = 'date_pub'
+    order_type: type = datetime
+    descending: bool = True
+
+    def get_queryset(self, request: HttpRequest, **kwargs: Any) -> QuerySet:
+        posts: QuerySet = Post.objects.all()
+        if request.GET.get('search'):
+            posts = posts.search(request.GET['search'])
+        if request.GET.get('tag'):
+            posts = posts.filter(tags__slug=request.GET['tag'].lower())
+        return posts
+
+    def extra_fields(self) -> List[str]:
+        return ['tags']
+
+    def attach_extra(self, items: List[Tuple[dict, dict]], names: Sequence[str]) -> None:
+        if 'tags' not in names:
+            return
+        by_post: Dict[int, dict] = {row['pk']: item for row, item in items}
+        for item in by_post.values():
+            item['tags'] = []
+        links = Post.tags.through.objects.filter(post_id__in=by_post).values_list('post_id', 'tag__slug')
+        for post_id, slug in links:
+            by_post[post_id]['tags'].append(slug)
+
+
+class TagResource(Resource):
+    fields: Dict[str, Field] = {
+        'id': Field('pk'),
+        'title': Field('title'),
+        'slug': Field('slug'),
+        'url': Field('slug', lambda slug: reverse('tag_detail_url', kwargs={'slug': slug})),
+    }
+    default_fields: Sequence[str] = ('id', 'title', 'slug', 'url')
+
+    def get_queryset(self, request: HttpRequest, **kwargs: Any) -> QuerySet:
+        return Tag.objects.all()
+
+
+class CommentResource(Resource):
+    fields: Dict[str, Field] = {
+        'id': Field('pk'),
+        'author': Field('author__username'),
+        'text': Field('text'),
+        'created_at': Field('created_at'),
+    }
+    default_fields: Sequence[str] = ('id', 'author', 'text', 'created_at')
+    order_field: str = 'created_at'
+    order_type: type = datetime
+
+    def get_queryset(self, request: HttpRequest, **kwargs: Any) -> QuerySet:
+        post_id: Optional[int] = Post.objects.filter(
+            slug__iexact=kwargs['slug']).values_list('pk', flat=True).first()
+        if post_id is None:
+            raise ApiNotFound('Not found.')
+        return Comment.objects.filter(post_id=post_id)
+
+
+def api_etag(request: HttpRequest, **kwargs: Any) -> str:
+    """
+    Returns an ETag that changes with any content change and with the query.
+    """
+    query: str = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{family_version(CONTENT_FAMILY)}-{query}'
+
+
+def error_response(message: str, status: int = 400) -> JsonResponse:
+    return JsonResponse({'error': message}, status=status)
+
+
+def list_view(resource: Resource) -> Callable[..., HttpResponse]:
+    """
+    Builds a streaming, paginated list view for a resource.
+    """
+
+    @require_GET
+    @condition(etag_func=api_etag)
+    def view(request: HttpRequest, **kwargs: Any) -> HttpResponse:
+        try:
+            limit: int = min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            return error_response('Invalid limit.')
+        try:
+            names: List[str] = resource.parse_fields(request, resource.default_fields)
+            queryset: QuerySet = resource.paginate(
+                resource.get_queryset(request, **kwargs), request.GET.get('cursor'))
+        except ApiError as error:
+            return error_response(str(error), status=error.status)
+        return StreamingHttpResponse(
+            resource.stream(queryset, names, limit), content_type='application/json')
+
+    return view
+
+
+@require_GET
+@condition(etag_func=api_etag)
+def post_detail(request: HttpRequest, slug: str) -> HttpResponse:
+    """
+    Returns a single post.
+    """
+    resource = PostResource()
+    try:
+        names: List[str] = resource.parse_fields(request, resource.detail_fields)
+    except ApiError as error:
+        return error_response(str(error))
+
+    row: Optional[dict] = Post.objects.filter(slug__iexact=slug).values(*resource.columns(names)).first()
+    if row is None:
+        return error_response('Not found.', status=404)
+    item: dict = resource.serialize(row, names)
+    resource.attach_extra([(row, item)], names)
+    return JsonResponse(item)
+
+
+posts_list = list_view(PostResource())
+tags_list = list_view(TagResource())
+comments_list = list_view(CommentResource())
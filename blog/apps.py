@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field: str = 'django.db.models.BigAutoField'
     name: str = 'blog'
+
+    def ready(self) -> None:
+        """
+        Connects the signal handlers that keep cached documents fresh
+        and registers the system checks of the blog.
+        """
+        from . import checks, signals  # noqa: F401
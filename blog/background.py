@@ -0,0 +1,56 @@
+import atexit
+import logging
+import threading
+from typing import Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundFlusher:
+    """
+    Calls a flush function from a daemon thread.
+
+    The function runs every `interval` seconds, when `wake()` is called
+    and once more when the process exits. The thread is only started
+    on first use, so importing this module costs nothing.
+    """
+
+    def __init__(self, flush: Callable[[], int], interval: float, name: str) -> None:
+        self.flush = flush
+        self.interval = interval
+        self.name = name
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Starts the worker thread if it is not running yet.
+        """
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self._flush_safely)
+
+    def wake(self) -> None:
+        """
+        Asks the worker thread to flush without waiting for the interval.
+        """
+        self._event.set()
+
+    def _run(self) -> None:
+        while True:
+            self._event.wait(self.interval)
+            self._event.clear()
+            self._flush_safely()
+
+    def _flush_safely(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('%s flush failed', self.name)
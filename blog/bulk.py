@@ -0,0 +1,155 @@
+"""
+Set-based bulk operations on posts and tags.
+
+Deleting through `Model.delete()` makes Django's collector load related
+rows into memory before the cascade. The functions here delete with plain
+DELETE statements instead, batch by batch within a single transaction, and
+report progress. Signals are not sent, so cached documents are invalidated
+here explicitly.
+"""
+import logging
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import QuerySet
+
+from .caching import SITEMAP_FAMILY, tag_feed_family
+from .models import Comment, Post, RelatedPost, Tag
+from .related import refresh_related_posts
+from .signals import invalidate_on_commit, post_families
+
+
+logger = logging.getLogger(__name__)
+
+Progress = Optional[Callable[[str, int, int], None]]
+
+
+def chunks(values: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def report(progress: Progress, stage: str, done: int, total: int) -> None:
+    logger.info('%s: %d of %d', stage, done, total)
+    if progress is not None:
+        progress(stage, done, total)
+
+
+def raw_delete(queryset: QuerySet) -> int:
+    """
+    Deletes the rows of a queryset with a single DELETE, without the collector.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_posts(posts: QuerySet, progress: Progress = None) -> Dict[str, int]:
+    """
+    Deletes posts together with their comments and tag links.
+
+    Comments are deleted in batches of BLOG_BULK_BATCH_SIZE rows,
+    `progress` is called with the stage, the number of deleted rows and the total.
+    """
+    batch_size: int = settings.BLOG_BULK_BATCH_SIZE
+    post_ids: List[int] = list(posts.values_list('pk', flat=True))
+    slugs: List[str] = list(
+        Tag.objects.filter(posts__in=posts.values('pk')).values_list('slug', flat=True).distinct())
+
+    with transaction.atomic(using=posts.db):
+        total_comments: int = Comment.objects.filter(post__in=posts.values('pk')).count()
+        deleted_comments: int = 0
+        deleted_posts: int = 0
+        for chunk in chunks(post_ids, batch_size):
+            comments: QuerySet = Comment.objects.filter(post_id__in=chunk)
+            while True:
+                deleted: int = raw_delete(Comment.objects.filter(pk__in=comments.values('pk')[:batch_size]))
+                if not deleted:
+                    break
+                deleted_comments += deleted
+                report(progress, 'comments', deleted_comments, total_comments)
+
+            raw_delete(RelatedPost.objects.filter(post_id__in=chunk))
+            raw_delete(RelatedPost.objects.filter(related_id__in=chunk))
+            raw_delete(Post.tags.through.objects.filter(post_id__in=chunk))
+            deleted_posts += raw_delete(Post.objects.filter(pk__in=chunk))
+            report(progress, 'posts', deleted_posts, len(post_ids))
+
+        invalidate_on_commit(post_families(slugs))
+    return {'posts': deleted_posts, 'comments': deleted_comments}
+
+
+def delete_tags(tags: QuerySet, progress: Progress = None) -> Dict[str, int]:
+    """
+    Deletes tags and their links to posts, leaving the posts in place.
+    The related posts of the posts that lost a tag are recomputed.
+    """
+    batch_size: int = settings.BLOG_BULK_BATCH_SIZE
+    rows: List[tuple] = list(tags.values_list('pk', 'slug'))
+    tag_ids: List[int] = [pk for pk, _ in rows]
+    post_ids: List[int] = list(
+        Post.tags.through.objects.filter(tag_id__in=tags.values('pk'))
+        .values_list('post_id', flat=True).distinct())
+
+    with transaction.atomic(using=tags.db):
+        deleted_tags: int = 0
+        links: int = 0
+        for chunk in chunks(tag_ids, batch_size):
+            links += raw_delete(Post.tags.through.objects.filter(tag_id__in=chunk))
+            deleted_tags += raw_delete(Tag.objects.filter(pk__in=chunk))
+            report(progress, 'tags', deleted_tags, len(tag_ids))
+
+        refresh_related_posts(post_ids)
+        invalidate_on_commit([SITEMAP_FAMILY] + [tag_feed_family(slug) for _, slug in rows])
+    return {'tags': deleted_tags, 'links': links}
+
+
+def merge_tags(tags: QuerySet, target: Tag) -> Dict[str, int]:
+    """
+    Moves all posts of the given tags to the target tag and deletes the other tags.
+
+    Links are copied with a single INSERT ... SELECT, skipping posts that already
+    have the target tag. The related posts of the moved posts are recomputed.
+    """
+    sources: List[tuple] = list(tags.exclude(pk=target.pk).values_list('pk', 'slug'))
+    source_ids: List[int] = [pk for pk, _ in sources]
+    if not source_ids:
+        return {'tags': 0, 'links': 0}
+
+    through: Any = Post.tags.through
+    connection = connections[tags.db]
+    quote = connection.ops.quote_name
+    table: str = quote(through._meta.db_table)
+    placeholders: str = ', '.join(['%s'] * len(source_ids))
+    post_ids: List[int] = list(
+        through.objects.filter(tag_id__in=source_ids).values_list('post_id', flat=True).distinct())
+
+    with transaction.atomic(using=tags.db):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({quote("post_id")}, {quote("tag_id")}) '
+                f'SELECT DISTINCT {quote("post_id")}, %s FROM {table} '
+                f'WHERE {quote("tag_id")} IN ({placeholders}) '
+                f'AND {quote("post_id")} NOT IN '
+                f'(SELECT {quote("post_id")} FROM {table} WHERE {quote("tag_id")} = %s)',
+                [target.pk, *source_ids, target.pk],
+            )
+            links: int = cursor.rowcount
+        raw_delete(through.objects.filter(tag_id__in=source_ids))
+        deleted_tags: int = raw_delete(Tag.objects.filter(pk__in=source_ids))
+        refresh_related_posts(post_ids)
+
+        invalidate_on_commit(
+            [SITEMAP_FAMILY, tag_feed_family(target.slug)]
+            + [tag_feed_family(slug) for _, slug in sources])
+    return {'tags': deleted_tags, 'links': links}
+
+
+def rename_tag(tag: Tag, title: str, slug: str) -> None:
+    """
+    Changes the title and the slug of a tag with a single UPDATE.
+    """
+    old_slug: str = tag.slug
+    with transaction.atomic():
+        Tag.objects.filter(pk=tag.pk).update(title=title, slug=slug)
+        invalidate_on_commit([SITEMAP_FAMILY, tag_feed_family(old_slug), tag_feed_family(slug)])
+    tag.title, tag.slug = title, slug
@@ -0,0 +1,177 @@
+import hashlib
+import time
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+
+# Families of cached documents, invalidated independently of each other.
+# The content family changes with any post, tag or comment.
+CONTENT_FAMILY: str = 'content'
+POSTS_FEED_FAMILY: str = 'posts-feed'
+SITEMAP_FAMILY: str = 'sitemap'
+
+# Sent by warm_blog_cache with a signed token, so that warming does not count
+# as reading. Tokens expire, so a leaked one cannot suppress counting for long.
+WARMING_HEADER: str = 'X-Cache-Warming'
+WARMING_SALT: str = 'blog.caching.warming'
+WARMING_TOKEN_MAX_AGE: int = 60 * 60
+
+
+def tag_feed_family(slug: str) -> str:
+    """
+    Returns the document family of the feeds of a tag.
+    """
+    return f'tag-feed:{slug.lower()}'
+
+
+def initial_version() -> int:
+    """
+    Returns a first version for a family whose version is not in the cache.
+
+    Versions start from the current time in microseconds rather than 1, so
+    that a family whose version was evicted never goes back to a version
+    it already had, and never serves documents stored under it.
+    """
+    return time.time_ns() // 1000
+
+
+def family_version(family: str) -> int:
+    """
+    Returns the current version of a family of cached documents.
+    """
+    return cache.get_or_set(f'blog:family:{family}', initial_version, None)
+
+
+def invalidate_families(families: Iterable[str]) -> None:
+    """
+    Bumps the versions of document families, so that their documents
+    are regenerated on the next request. Other families stay cached.
+    """
+    for family in set(families):
+        key: str = f'blog:family:{family}'
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, initial_version(), None)
+
+
+def cached_document(family: str, variant: str, build: Callable[[], HttpResponse]) -> dict:
+    """
+    Returns a generated document from the cache, building it on a miss.
+
+    The entry holds the content, its content type and a strong ETag.
+    """
+    key: str = f'blog:document:{family}:{family_version(family)}:{variant}'
+    entry: Optional[dict] = cache.get(key)
+    if entry is None:
+        response: HttpResponse = build()
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        content: bytes = response.content
+        entry = {
+            'content': content,
+            'content_type': response['Content-Type'],
+            'etag': f'"{hashlib.md5(content).hexdigest()}"',
+        }
+        cache.set(key, entry, settings.BLOG_DOCUMENT_CACHE_TIMEOUT)
+    return entry
+
+
+def serve_cached_document(
+        request: HttpRequest, family: str, variant: str, build: Callable[[], HttpResponse]) -> HttpResponse:
+    """
+    Serves a cached document, answering conditional requests with 304 Not Modified.
+    """
+    entry: dict = cached_document(family, variant, build)
+    response: Optional[HttpResponse] = get_conditional_response(request, etag=entry['etag'])
+    if response is None:
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['ETag'] = entry['etag']
+    patch_cache_control(response, public=True, max_age=settings.BLOG_DOCUMENT_MAX_AGE)
+    return response
+
+
+def warming_token() -> str:
+    """
+    Returns a token for WARMING_HEADER, signed with SECRET_KEY.
+    """
+    return signing.TimestampSigner(salt=WARMING_SALT).sign('warm')
+
+
+def is_warming_request(request: HttpRequest) -> bool:
+    """
+    Returns True if the request comes from warm_blog_cache. A header
+    without a valid, unexpired token is ignored, so clients cannot fake it.
+    """
+    token: Optional[str] = request.headers.get(WARMING_HEADER)
+    if not token:
+        return False
+    try:
+        signing.TimestampSigner(salt=WARMING_SALT).unsign(token, max_age=WARMING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def page_cache_key(path: str, variant: str = '') -> str:
+    """
+    Returns the cache key of an anonymous page, which changes with any content change.
+    """
+    digest: str = hashlib.md5(f'{path}?{variant}'.encode()).hexdigest()
+    return f'blog:page:{family_version(CONTENT_FAMILY)}:{digest}'
+
+
+def is_page_cacheable(request: HttpRequest) -> bool:
+    """
+    Returns True if the page is the same for every anonymous visitor.
+    Pending flash messages are rendered into the page, so they prevent caching.
+    """
+    return (
+        settings.BLOG_PAGE_CACHE_TIMEOUT > 0
+        and request.method == 'GET'
+        and not request.user.is_authenticated
+        and 'messages' not in request.COOKIES
+    )
+
+
+def cached_page(request: HttpRequest, build: Callable[[], HttpResponse], variant: str = '') -> HttpResponse:
+    """
+    Serves a page rendered for anonymous visitors from the cache.
+
+    The key is the path without the query string plus `variant`, which views
+    that read query parameters build from their normalized values, so junk
+    parameters cannot fill the cache. Pages are stored only if they set no
+    cookies, use no CSRF token, which is bound to a visitor, and are not
+    marked private, which views do for URLs that are not canonical. Views
+    can put data that they need on cache hits into `response.page_meta`.
+    The X-Cache header tells hits from misses.
+    """
+    if not is_page_cacheable(request):
+        return build()
+
+    key: str = page_cache_key(request.path, variant)
+    entry: Optional[dict] = cache.get(key)
+    if entry is not None:
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        response.page_meta = entry['meta']
+        response['X-Cache'] = 'HIT'
+        return response
+
+    response = build()
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    if (response.status_code == 200 and not response.streaming and not response.cookies
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            and 'private' not in response.get('Cache-Control', '')):
+        cache.set(key, {
+            'content': response.content,
+            'content_type': response['Content-Type'],
+            'meta': getattr(response, 'page_meta', {}),
+        }, settings.BLOG_PAGE_CACHE_TIMEOUT)
+    response['X-Cache'] = 'MISS'
+    return response
@@ -0,0 +1,35 @@
+from typing import Any, List
+
+from django.conf import settings
+from django.core.checks import CheckMessage, Tags, Warning, register
+
+
+LOCAL_MEMORY_CACHE: str = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches)
+def check_session_cache(app_configs: Any = None, **kwargs: Any) -> List[CheckMessage]:
+    """
+    Warns when cache-backed sessions use a cache private to each process.
+    """
+    backend: str = settings.CACHES.get(settings.SESSION_CACHE_ALIAS, {}).get('BACKEND', '')
+    if backend != LOCAL_MEMORY_CACHE:
+        return []
+
+    if settings.SESSION_ENGINE == settings.SESSION_ENGINES['cache']:
+        return [Warning(
+            'The cache session backend stores sessions in local memory.',
+            hint='Sessions exist in one worker process only and are lost on restart, so users are '
+                 'logged out. Set BLOG_SESSION_CACHE_BACKEND and BLOG_SESSION_CACHE_LOCATION to a '
+                 'shared cache, or use BLOG_SESSION_BACKEND=cached_db or db.',
+            id='blog.W001',
+        )]
+    if settings.SESSION_ENGINE == settings.SESSION_ENGINES['cached_db']:
+        return [Warning(
+            'The cached_db session backend caches sessions in local memory.',
+            hint='With several worker processes a session deleted on logout stays cached on the '
+                 'other workers. Set BLOG_SESSION_CACHE_BACKEND and BLOG_SESSION_CACHE_LOCATION to '
+                 'a shared cache, or use BLOG_SESSION_BACKEND=db.',
+            id='blog.W002',
+        )]
+    return []
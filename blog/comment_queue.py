@@ -0,0 +1,121 @@
+import logging
+import threading
+from typing import List
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, transaction
+
+from .background import BackgroundFlusher
+from .caching import CONTENT_FAMILY, invalidate_families
+from .models import Comment
+
+
+logger = logging.getLogger(__name__)
+
+
+class CommentWriteBehind:
+    """
+    Queues new comments in memory and writes them in batches.
+
+    A background thread inserts the queued comments with a single
+    `bulk_create` per transaction, so a burst of comments takes the
+    SQLite write lock once instead of once per comment. Until they are
+    flushed, queued comments are only visible to their authors, and only
+    on the worker process that accepted them.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: List[Comment] = []
+        self._flusher = BackgroundFlusher(
+            self.flush, settings.BLOG_COMMENT_FLUSH_INTERVAL, name='comment-write-behind')
+
+    def submit(self, comment: Comment) -> None:
+        """
+        Queues an unsaved comment for the next batch.
+        """
+        with self._lock:
+            self._pending.append(comment)
+            size: int = len(self._pending)
+
+        self._flusher.start()
+        if size >= settings.BLOG_COMMENT_BATCH_SIZE:
+            self._flusher.wake()
+
+    def pending_for(self, post_id: int, author_id: int) -> List[Comment]:
+        """
+        Returns the queued comments of an author on a post.
+        """
+        with self._lock:
+            return [
+                comment for comment in self._pending
+                if comment.post_id == post_id and comment.author_id == author_id
+            ]
+
+    def flush(self) -> int:
+        """
+        Writes all queued comments and returns how many were written.
+
+        When the batch insert fails for another reason than a locked or
+        unavailable database, the comments are inserted one at a time, so
+        a single bad row, such as a comment on a post deleted meanwhile,
+        only loses that comment.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+
+        try:
+            with transaction.atomic():
+                Comment.objects.bulk_create(batch, batch_size=settings.BLOG_COMMENT_BATCH_SIZE)
+            invalidate_families([CONTENT_FAMILY])
+            written: int = len(batch)
+        except OperationalError:
+            # The database is locked or unavailable: retry with the next batch.
+            self._requeue(batch)
+            raise
+        except DatabaseError:
+            logger.warning('Inserting %d comments failed, inserting them one by one', len(batch), exc_info=True)
+            written = self._insert_each(batch)
+
+        logger.debug('Flushed %d comments', written)
+        return written
+
+    def _insert_each(self, batch: List[Comment]) -> int:
+        """
+        Inserts comments in separate transactions, dropping the ones the
+        database rejects, and returns how many were written.
+        """
+        written: int = 0
+        try:
+            for index, comment in enumerate(batch):
+                comment.pk = None
+                try:
+                    with transaction.atomic():
+                        comment.save(force_insert=True)
+                except OperationalError:
+                    self._requeue(batch[index:])
+                    raise
+                except DatabaseError:
+                    logger.exception(
+                        'Dropped comment of user %s on post %s', comment.author_id, comment.post_id)
+                else:
+                    written += 1
+        finally:
+            if written:
+                invalidate_families([CONTENT_FAMILY])
+        return written
+
+    def _requeue(self, batch: List[Comment]) -> None:
+        """
+        Puts comments of a failed insert back in front of the queue.
+        """
+        for comment in batch:
+            # A rolled back insert may have assigned primary keys already.
+            comment.pk = None
+        with self._lock:
+            self._pending = batch + self._pending
+
+
+comment_queue = CommentWriteBehind()
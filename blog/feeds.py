@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+from typing import Any, List
+
+from .models import Post, Tag
+
+
+class LatestPostsFeed(Feed):
+    """
+    RSS feed of the newest posts.
+    """
+    title: str = 'Блог'
+    link: str = reverse_lazy('posts_list_url')
+    description: str = 'Новые посты блога'
+
+    def items(self) -> List[Post]:
+        return Post.objects.for_feed()[:settings.BLOG_FEED_SIZE]
+
+    def item_title(self, item: Post) -> str:
+        return item.title
+
+    def item_description(self, item: Post) -> str:
+        return item.excerpt
+
+    def item_pubdate(self, item: Post) -> Any:
+        return item.date_pub
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    """
+    Atom feed of the newest posts.
+    """
+    feed_type: Any = Atom1Feed
+    subtitle: str = LatestPostsFeed.description
+
+
+class TagPostsFeed(LatestPostsFeed):
+    """
+    RSS feed of the newest posts with a tag.
+    """
+
+    def get_object(self, request: Any, slug: str) -> Tag:
+        return get_object_or_404(Tag, slug__iexact=slug)
+
+    def title(self, obj: Tag) -> str:
+        return f'Блог: {obj.title}'
+
+    def link(self, obj: Tag) -> str:
+        return obj.get_absolute_url()
+
+    def description(self, obj: Tag) -> str:
+        return f'Новые посты с тегом {obj.title}'
+
+    def items(self, obj: Tag) -> List[Post]:
+        return obj.posts.for_feed()[:settings.BLOG_FEED_SIZE]
+
+
+class TagPostsAtomFeed(TagPostsFeed):
+    """
+    Atom feed of the newest posts with a tag.
+    """
+    feed_type: Any = Atom1Feed
+
+    def subtitle(self, obj: Tag) -> str:
+        return self.description(obj)
+
+
+FEEDS: dict = {
+    'rss': LatestPostsFeed(),
+    'atom': LatestPostsAtomFeed(),
+}
+
+TAG_FEEDS: dict = {
+    'rss': TagPostsFeed(),
+    'atom': TagPostsAtomFeed(),
+}
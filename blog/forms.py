@@ -3,9 +3,10 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 
 from .models import Tag, Post, Comment
-from typing import List
+from typing import Any, List, Optional
 
 
 class RegistrationForm(UserCreationForm):
@@ -35,11 +36,76 @@ class LoginForm(AuthenticationForm):
     }
 
 
-class PostForm(forms.ModelForm):
+class UniqueSlugFormMixin:
+    """
+    Checks that the slug is unique with a single indexed EXISTS query.
+
+    Slugs are stored in lower case, so an exact lookup of the lowercased
+    slug finds slugs that differ only in case too. The model's own unique
+    check for the slug is skipped, as it would run the same query again.
+    The database constraint stays the final arbiter: a slug taken
+    concurrently makes `save()` return None and adds the error to the form
+    instead of raising IntegrityError. Other integrity errors are raised.
+    """
+    reserved_slugs: List[str] = ['create']
+    slug_taken_message: str = 'Адрес должен быть уникальным. "%s" уже используется.'
+
+    def check_slug(self, slug: str) -> str:
+        """
+        Raises ValidationError if the slug is reserved or already used by another object.
+        """
+        if slug in self.reserved_slugs:
+            raise ValidationError(f'Адрес не может быть "{slug}"')
+
+        if self.slug_taken(slug):
+            raise ValidationError(self.slug_taken_message % slug)
+        return slug
+
+    def slug_taken(self, slug: str) -> bool:
+        """
+        Returns True if another object uses the slug.
+        """
+        objects: Any = self._meta.model.objects.filter(slug=slug)
+        if self.instance.pk:
+            objects = objects.exclude(pk=self.instance.pk)
+        return objects.exists()
+
+    def validate_unique(self) -> None:
+        """
+        Runs the model's unique checks except for the slug, which clean_slug has checked.
+        """
+        exclude = self._get_validation_exclusions()
+        exclude.add('slug')
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except ValidationError as e:
+            self._update_errors(e)
+
+    def save(self, commit: bool = True) -> Optional[Any]:
+        """
+        Saves the object, mapping a slug conflict in the database to a form error.
+        """
+        if not commit:
+            return super().save(commit=False)
+        try:
+            with transaction.atomic():
+                return super().save(commit=True)
+        except IntegrityError:
+            if not self.slug_taken(self.instance.slug):
+                raise
+            self.add_error('slug', self.slug_taken_message % self.instance.slug)
+            # Keep links of the re-rendered form pointing to the stored object.
+            if 'slug' in self.initial:
+                self.instance.slug = self.initial['slug']
+            return None
+
+
+class PostForm(UniqueSlugFormMixin, forms.ModelForm):
     """
     A form for creating or updating a Post object.
     """
     image = forms.ImageField(required=False)
+    slug_taken_message: str = 'Адрес поста должен быть уникальным. "%s" уже используется.'
 
     class Meta:
         model: 'Post' = Post
@@ -54,16 +120,16 @@ class PostForm(forms.ModelForm):
             # 'image': forms.ClearableFileInput(attrs={'class': 'form-control', 'multiple': True, 'accept': 'image/*',}),
         }
 
-        def clean_slug(self: 'PostForm') -> str:
-            """
-            Validates the 'slug' field to ensure that it is not the same as 'create'.
-            Raises ValidationError if the 'slug' field is the same as 'create'.
-            """
-            new_slug: str = self.cleaned_data['slug'].lower()
+    def clean_slug(self: 'PostForm') -> str:
+        """
+        Validates the 'slug' field to ensure that it is unique and not the same as 'create'.
+        New posts get a generated slug on save, so only existing posts are checked.
+        """
+        new_slug: str = self.cleaned_data['slug'].lower()
 
-            if new_slug == 'create':
-                raise ValidationError(f'Адрес тега должен быть уникальным. "{new_slug}" уже используется.')
+        if not self.instance.pk:
             return new_slug
+        return self.check_slug(new_slug)
         
 
 class CommentForm(forms.ModelForm):
@@ -80,10 +146,12 @@ class CommentForm(forms.ModelForm):
         }
 
 
-class TagForm(forms.ModelForm):
+class TagForm(UniqueSlugFormMixin, forms.ModelForm):
     """
     A form for creating or updating a Tag object.
     """
+    slug_taken_message: str = 'Адрес тега должен быть уникальным. "%s" уже используется.'
+
     class Meta:
         model: 'Tag' = Tag
         fields: List[str] = ['title', 'slug']
@@ -99,12 +167,4 @@ class TagForm(forms.ModelForm):
         Raises ValidationError if the 'slug' field is not unique or is the same as 'create'.
         """
         new_slug: str = self.cleaned_data['slug'].lower()
-
-        if new_slug == 'create':
-            raise forms.ValidationError('Уникальный адрес тега не может быть "create"')
-
-        if Tag.objects.filter(slug__iexact=new_slug).count():
-            raise forms.ValidationError(
-                f'Адрес тега должен быть уникальным. "{new_slug}" уже используется.')
-
-        return new_slug
+        return self.check_slug(new_slug)
@@ -0,0 +1,175 @@
+"""
+Password hashers with tunable cost that run on a bounded worker pool.
+
+Hashing a password is deliberately slow. Running it on a small pool caps
+how many CPU cores a burst of logins or registrations can occupy, so
+other views keep being served. When the pool and its queue are full,
+`HashingPoolBusy` is raised and `HashingPoolBusyMiddleware` answers 503
+instead of queueing without bound. Queue times are logged every
+BLOG_HASHING_STATS_INTERVAL seconds while the pool is in use.
+`PASSWORD_HASHERS` lists all hashers of this module with the configured
+profile first, so Django rehashes old passwords on login.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+from .background import BackgroundFlusher
+
+
+logger = logging.getLogger(__name__)
+
+
+class HashingPoolBusy(Exception):
+    """
+    Raised when no hashing worker becomes available in time.
+    """
+
+
+class HashingPool:
+    """
+    A thread pool that limits concurrent password hashing.
+
+    Hashing in hashlib and argon2 releases the GIL, so the workers run
+    in parallel. At most `workers` hashes run at once and at most
+    `queue_size` more wait; anything beyond waits up to `timeout`
+    seconds for a slot and then fails. The queue time of a job covers
+    both the wait for a slot and the wait for a worker.
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout: float, stats_interval: float = 0) -> None:
+        self.workers = workers
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, float] = {
+            'completed': 0, 'rejected': 0, 'queue_time_total': 0.0, 'queue_time_max': 0.0,
+        }
+        self._logged: Dict[str, float] = dict(self._stats)
+        self._interval_max: float = 0.0
+        self._reporter: Optional[BackgroundFlusher] = None
+        if stats_interval > 0:
+            self._reporter = BackgroundFlusher(self.log_stats, stats_interval, name='hashing-stats')
+
+    def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs a function on the pool and returns its result.
+        """
+        # Hashers call each other (verify calls encode), which must not queue again.
+        if getattr(self._local, 'active', False):
+            return function(*args)
+        if self._reporter is not None:
+            self._reporter.start()
+        queued_at: float = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._stats_lock:
+                self._stats['rejected'] += 1
+            logger.warning('Password hashing pool is busy, request rejected')
+            raise HashingPoolBusy
+
+        try:
+            return self._get_executor().submit(self._call, queued_at, function, *args).result()
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns counters of completed and rejected jobs and queue times in seconds.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queue_time_avg'] = stats['queue_time_total'] / stats['completed'] if stats['completed'] else 0.0
+        return stats
+
+    def log_stats(self) -> int:
+        """
+        Logs the jobs and queue times since the last report and returns the
+        number of jobs. Nothing is logged while the pool is idle.
+        """
+        with self._stats_lock:
+            current: Dict[str, float] = dict(self._stats)
+            previous, self._logged = self._logged, current
+            interval_max, self._interval_max = self._interval_max, 0.0
+        completed: int = int(current['completed'] - previous['completed'])
+        rejected: int = int(current['rejected'] - previous['rejected'])
+        if not completed and not rejected:
+            return 0
+        queue_time: float = current['queue_time_total'] - previous['queue_time_total']
+        logger.info(
+            'Password hashing: %d completed, %d rejected, queue time avg %.1f ms, max %.1f ms',
+            completed, rejected, queue_time / completed * 1000 if completed else 0.0,
+            interval_max * 1000)
+        return completed + rejected
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hashing')
+        return self._executor
+
+    def _call(self, queued_at: float, function: Callable[..., Any], *args: Any) -> Any:
+        queue_time: float = time.monotonic() - queued_at
+        self._local.active = True
+        try:
+            return function(*args)
+        finally:
+            self._local.active = False
+            with self._stats_lock:
+                self._stats['completed'] += 1
+                self._stats['queue_time_total'] += queue_time
+                self._stats['queue_time_max'] = max(self._stats['queue_time_max'], queue_time)
+                self._interval_max = max(self._interval_max, queue_time)
+
+
+hashing_pool = HashingPool(
+    workers=settings.BLOG_HASHING_WORKERS,
+    queue_size=settings.BLOG_HASHING_QUEUE_SIZE,
+    timeout=settings.BLOG_HASHING_QUEUE_TIMEOUT,
+    stats_interval=settings.BLOG_HASHING_STATS_INTERVAL,
+)
+
+
+class PooledHasherMixin:
+    """
+    Runs the expensive hasher methods on the hashing pool.
+    """
+
+    def encode(self, *args: Any, **kwargs: Any) -> str:
+        return hashing_pool.run(lambda: super(PooledHasherMixin, self).encode(*args, **kwargs))
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return hashing_pool.run(super().verify, password, encoded)
+
+    def harden_runtime(self, password: str, encoded: str) -> None:
+        return hashing_pool.run(super().harden_runtime, password, encoded)
+
+
+class PooledPBKDF2PasswordHasher(PooledHasherMixin, PBKDF2PasswordHasher):
+    iterations: int = settings.BLOG_PBKDF2_ITERATIONS
+
+
+class PooledScryptPasswordHasher(PooledHasherMixin, ScryptPasswordHasher):
+    work_factor: int = settings.BLOG_SCRYPT_WORK_FACTOR
+    block_size: int = settings.BLOG_SCRYPT_BLOCK_SIZE
+
+
+class PooledArgon2PasswordHasher(PooledHasherMixin, Argon2PasswordHasher):
+    """
+    Requires the argon2-cffi package.
+    """
+    time_cost: int = settings.BLOG_ARGON2_TIME_COST
+    memory_cost: int = settings.BLOG_ARGON2_MEMORY_COST
+    parallelism: int = settings.BLOG_ARGON2_PARALLELISM
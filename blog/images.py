@@ -0,0 +1,32 @@
+import base64
+from io import BytesIO
+from typing import IO, Tuple
+
+
+PLACEHOLDER_WIDTH: int = 16
+PLACEHOLDER_BLUR_RADIUS: int = 2
+
+
+def read_image_metadata(file: IO[bytes]) -> Tuple[int, int, str]:
+    """
+    Reads the dimensions of an uploaded image and builds a blurred placeholder.
+
+    Returns a tuple of width, height and a data URI with a tiny blurred
+    JPEG copy of the image, which templates inline while the real image loads.
+    Pillow is imported here, so that only image uploads pay for loading it.
+    """
+    from PIL import Image, ImageFilter
+
+    file.seek(0)
+    with Image.open(file) as image:
+        width, height = image.size
+        thumbnail = image.convert('RGB')
+        thumbnail.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH))
+        thumbnail = thumbnail.filter(ImageFilter.GaussianBlur(PLACEHOLDER_BLUR_RADIUS))
+
+        buffer = BytesIO()
+        thumbnail.save(buffer, format='JPEG', quality=40)
+    file.seek(0)
+
+    encoded: str = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return width, height, f'data:image/jpeg;base64,{encoded}'
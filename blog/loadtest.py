@@ -0,0 +1,267 @@
+"""
+Replay of recorded request traces for load testing.
+
+A trace is a JSONL file with one request per line::
+
+    {"t": 0.25, "session": "a1", "label": "post_detail_url",
+     "method": "POST", "path": "/blog/post/x/comment/", "data": {"text": "..."}}
+
+`t` is the time of the request in seconds, made relative to the first
+request when the trace is read, and `session`
+groups requests made by one visitor. The requests of a session are sent in
+order by one client with its own cookies, so logins and CSRF tokens carry
+over. Sessions are spread over a fixed number of concurrent clients.
+Traces are written by `make_load_trace` or recorded from a running
+instance by `TraceRecorderMiddleware`. Redacted form values are replaced
+on replay: passwords and usernames by the given credentials, anything
+else by a filler text.
+"""
+import importlib.util
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from math import ceil
+from typing import Dict, Iterable, List, Optional, Sequence
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, OpenerDirector, Request, build_opener
+
+from django.conf import settings
+
+from .middleware import PASSWORD_FIELDS, REDACTED
+
+
+# Sent for redacted form fields without a given replacement.
+FILLER: str = 'Load test'
+
+
+def read_trace(path: str) -> List[dict]:
+    """
+    Reads a JSONL trace, skipping empty lines, with times made relative
+    to the first request.
+    """
+    with open(path, encoding='utf-8') as trace:
+        entries: List[dict] = [json.loads(line) for line in trace if line.strip()]
+    start: float = min((entry.get('t', 0) for entry in entries), default=0)
+    for entry in entries:
+        entry['t'] = entry.get('t', 0) - start
+    entries.sort(key=lambda entry: entry['t'])
+    return entries
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """
+    Returns the nearest-rank percentile of sorted values.
+    """
+    if not values:
+        return 0.0
+    return values[max(0, ceil(percent / 100 * len(values)) - 1)]
+
+
+class NoRedirect(HTTPRedirectHandler):
+    """
+    Reports redirects as responses instead of following them, so every
+    trace line is timed as exactly one request.
+    """
+
+    def redirect_request(self, *args, **kwargs) -> None:
+        return None
+
+
+class TraceClient:
+    """
+    Sends the requests of one session, keeping its cookies.
+    """
+
+    def __init__(self, base_url: str, password: Optional[str], timeout: float,
+                 username: Optional[str] = None) -> None:
+        self.base_url = base_url.rstrip('/')
+        self.password = password
+        self.username = username
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.opener: OpenerDirector = build_opener(HTTPCookieProcessor(self.cookies), NoRedirect)
+
+    def csrf_token(self) -> Optional[str]:
+        for cookie in self.cookies:
+            if cookie.name == settings.CSRF_COOKIE_NAME:
+                return cookie.value
+        return None
+
+    def prepare(self, entry: dict) -> None:
+        """
+        Fetches the CSRF cookie before the first POST of the session, so
+        that sending the POST itself can be timed alone.
+        """
+        if entry.get('method', 'GET').upper() == 'POST' and self.csrf_token() is None:
+            # Django sets the CSRF cookie when it renders the form.
+            self.open(Request(self.base_url + entry['path']))
+
+    def unredact(self, field: str) -> str:
+        """
+        Returns the value sent for a redacted form field.
+        """
+        if field in PASSWORD_FIELDS and self.password is not None:
+            return self.password
+        if field == 'username' and self.username is not None:
+            return self.username
+        return FILLER
+
+    def send(self, entry: dict) -> int:
+        """
+        Sends one request of the trace and returns the response status.
+        """
+        method: str = entry.get('method', 'GET').upper()
+        url: str = self.base_url + entry['path']
+        body: Optional[bytes] = None
+        headers: Dict[str, str] = {}
+
+        if method == 'POST':
+            data: Dict[str, str] = {
+                field: self.unredact(field) if value == REDACTED else value
+                for field, value in (entry.get('data') or {}).items()
+            }
+            data['csrfmiddlewaretoken'] = self.csrf_token() or ''
+            body = urlencode(data).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['Referer'] = url
+
+        return self.open(Request(url, data=body, headers=headers, method=method))
+
+    def open(self, request: Request) -> int:
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except HTTPError as error:
+            error.read()
+            return error.code
+
+
+class LoadReport:
+    """
+    Collects the latency and status of every request, grouped by label.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.started: float = time.perf_counter()
+        self.finished: float = self.started
+
+    def add(self, label: str, status: int, latency: float) -> None:
+        with self._lock:
+            self.latencies[label].append(latency)
+            self.statuses[label][status] += 1
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    def summary(self, label: Optional[str] = None) -> dict:
+        """
+        Returns counts, error rate and latency percentiles in milliseconds,
+        for one label or for all requests.
+        """
+        labels: Iterable[str] = [label] if label is not None else list(self.latencies)
+        latencies: List[float] = sorted(value for name in labels for value in self.latencies[name])
+        statuses: Dict[int, int] = defaultdict(int)
+        for name in labels:
+            for status, count in self.statuses[name].items():
+                statuses[status] += count
+        errors: int = sum(count for status, count in statuses.items() if status == 0 or status >= 400)
+        duration: float = self.finished - self.started
+        return {
+            'requests': len(latencies),
+            'throughput': len(latencies) / duration if duration else 0.0,
+            'error_rate': errors / len(latencies) if latencies else 0.0,
+            'statuses': dict(sorted(statuses.items())),
+            **{f'p{percent}': percentile(latencies, percent) * 1000 for percent in (50, 90, 95, 99)},
+            'max': latencies[-1] * 1000 if latencies else 0.0,
+        }
+
+
+def replay(trace: List[dict], base_url: str, concurrency: int, speed: float = 0.0,
+           password: Optional[str] = None, timeout: float = 30.0, username: Optional[str] = None,
+           report: Optional[LoadReport] = None) -> LoadReport:
+    """
+    Replays a trace with `concurrency` clients and returns the report.
+
+    With `speed` 0 requests are sent as fast as the server answers,
+    otherwise at the recorded pace multiplied by `speed`. Passing the
+    report of an earlier replay adds this replay's requests to it.
+    """
+    sessions: Dict[str, List[dict]] = defaultdict(list)
+    for entry in trace:
+        sessions[str(entry.get('session', ''))].append(entry)
+    if report is None:
+        report = LoadReport()
+    replay_started: float = time.perf_counter()
+
+    def run_session(entries: List[dict]) -> None:
+        client = TraceClient(base_url, password, timeout, username)
+        for entry in entries:
+            if speed:
+                delay: float = replay_started + entry.get('t', 0) / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            try:
+                client.prepare(entry)
+            except (URLError, OSError):
+                pass
+            started: float = time.perf_counter()
+            try:
+                status: int = client.send(entry)
+            except (URLError, OSError):
+                status = 0
+            report.add(entry.get('label') or entry.get('method', 'GET'), status, time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='load-client') as pool:
+        for _ in pool.map(run_session, sessions.values()):
+            pass
+    report.finish()
+    return report
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(server: str, port: int, workers: int = 1, quiet: bool = True) -> subprocess.Popen:
+    """
+    Starts the application on 127.0.0.1 and waits until it accepts connections.
+
+    The WSGI server is Django's threaded development server without the
+    autoreloader, the ASGI server is uvicorn, which has to be installed.
+    """
+    if server == 'wsgi':
+        command: List[str] = [
+            sys.executable, 'manage.py', 'runserver', '--noreload', '--skip-checks', f'127.0.0.1:{port}']
+    else:
+        if importlib.util.find_spec('uvicorn') is None:
+            raise RuntimeError('The ASGI server needs the uvicorn package.')
+        command = [
+            sys.executable, '-m', 'uvicorn', 'blog_engine.asgi:application',
+            '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers), '--no-access-log']
+    output = subprocess.DEVNULL if quiet else None
+    process = subprocess.Popen(command, cwd=settings.BASE_DIR, stdout=output, stderr=output)
+
+    deadline: float = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{server} server exited with code {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f'{server} server did not start within 30 seconds')
@@ -0,0 +1,114 @@
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+from blog.startup import ENTRY_POINTS, LOAD_URLCONF, run_python
+
+
+# Runs in a fresh interpreter and prints the boot phases in milliseconds as JSON.
+BOOT_SCRIPT: str = '''
+import json, sys, time
+started = time.perf_counter()
+import {module} as entry
+imported = time.perf_counter()
+{load_urlconf}
+urlconf = time.perf_counter()
+status = request(entry.application, {path!r}, {host!r})
+responded = time.perf_counter()
+modules = len(sys.modules)
+print(json.dumps({{
+    'import': (imported - started) * 1000,
+    'urlconf': (urlconf - imported) * 1000,
+    'first_request': (responded - urlconf) * 1000,
+    'status': status,
+    'modules': modules,
+}}))
+'''
+
+WSGI_REQUEST: str = '''
+def request(application, path, host):
+    from io import BytesIO
+    from wsgiref.util import setup_testing_defaults
+    environ = {'PATH_INFO': path, 'HTTP_HOST': host, 'wsgi.input': BytesIO()}
+    setup_testing_defaults(environ)
+    statuses = []
+    body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    b''.join(body)
+    return int(statuses[0].split()[0])
+'''
+
+ASGI_REQUEST: str = '''
+def request(application, path, host):
+    import asyncio
+    statuses = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+        'root_path': '', 'headers': [(b'host', host.encode())],
+        'client': ('127.0.0.1', 0), 'server': (host, 80),
+    }
+    asyncio.run(application(scope, receive, send))
+    return statuses[0]
+'''
+
+
+class Command(BaseCommand):
+    """
+    Measures how long a new worker takes until it has answered its first request.
+
+    Every run starts a new interpreter, imports the application, loads the
+    URLconf and sends one request through the WSGI or ASGI callable, so
+    the numbers include everything a freshly spawned worker pays before
+    it serves traffic. Wall time also includes interpreter startup.
+    """
+    help: str = 'Benchmarks cold boot of the WSGI or ASGI application.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--entry', choices=list(ENTRY_POINTS), default='wsgi',
+            help='Application entry point to boot.')
+        parser.add_argument(
+            '--runs', type=int, default=10,
+            help='Number of cold boots.')
+        parser.add_argument(
+            '--path', default='/blog/',
+            help='Path of the first request.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        request_code: str = WSGI_REQUEST if options['entry'] == 'wsgi' else ASGI_REQUEST
+        code: str = request_code + BOOT_SCRIPT.format(
+            module=ENTRY_POINTS[options['entry']],
+            load_urlconf=LOAD_URLCONF,
+            path=options['path'],
+            host=settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost',
+        )
+
+        results: List[Dict[str, float]] = []
+        for _ in range(options['runs']):
+            started: float = time.perf_counter()
+            result: Dict[str, float] = json.loads(run_python(code).stdout.splitlines()[-1])
+            result['wall'] = (time.perf_counter() - started) * 1000
+            results.append(result)
+
+        statuses = {result['status'] for result in results}
+        self.stdout.write(
+            f'{options["entry"]} boot, {options["runs"]} runs, first request to {options["path"]} '
+            f'answered with {", ".join(map(str, sorted(statuses)))}, '
+            f'{int(results[0]["modules"])} modules loaded')
+        self.stdout.write(f'{"phase":<16}{"min ms":>10}{"median ms":>12}{"max ms":>10}')
+        for phase in ('import', 'urlconf', 'first_request', 'wall'):
+            values: List[float] = [result[phase] for result in results]
+            self.stdout.write(
+                f'{phase:<16}{min(values):>10.1f}{statistics.median(values):>12.1f}{max(values):>10.1f}')
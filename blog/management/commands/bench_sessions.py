@@ -0,0 +1,68 @@
+import time
+from typing import Any, List
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Measures authenticated PostDetail throughput under each session backend.
+
+    The benchmark creates a user and a post inside a transaction that is
+    rolled back at the end, so it leaves the database untouched.
+    """
+    help: str = 'Benchmarks authenticated post detail requests for each session backend.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Number of timed requests per backend.')
+        parser.add_argument(
+            '--backends', nargs='+', default=list(settings.SESSION_ENGINES),
+            choices=list(settings.SESSION_ENGINES),
+            help='Session backends to benchmark.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        self.stdout.write(
+            f'{"backend":<16}{"req/s":>10}{"ms/req":>10}{"queries/req":>14}')
+        with transaction.atomic():
+            user: User = User.objects.create_user('bench-sessions', password='bench-sessions')
+            post: Post = Post.objects.create(title='Bench sessions', body='<p>Benchmark</p>')
+            url: str = post.get_absolute_url()
+
+            for backend in options['backends']:
+                self.bench(backend, user, url, options['requests'])
+
+            transaction.set_rollback(True)
+
+    def bench(self, backend: str, user: User, url: str, requests: int) -> None:
+        """
+        Logs in with a fresh client and times repeated requests of a post.
+        """
+        engine: str = settings.SESSION_ENGINES[backend]
+        with override_settings(SESSION_ENGINE=engine, ALLOWED_HOSTS=['testserver']):
+            client = Client()
+            client.force_login(user)
+            client.get(url)
+
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url)
+            query_count: int = len(queries.captured_queries)
+
+            timings: List[float] = []
+            for _ in range(requests):
+                started: float = time.perf_counter()
+                client.get(url)
+                timings.append(time.perf_counter() - started)
+
+        total: float = sum(timings)
+        self.stdout.write(
+            f'{backend:<16}{requests / total:>10.1f}{total / requests * 1000:>10.2f}'
+            f'{query_count:>14}')
@@ -0,0 +1,98 @@
+from typing import Any, List, Optional
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from blog.loadtest import LoadReport, free_port, read_trace, replay, start_server
+
+
+class Command(BaseCommand):
+    """
+    Replays a JSONL request trace against the blog and reports throughput,
+    latency percentiles and error rates.
+
+    Without `--url` the command starts the application itself, as WSGI
+    under Django's threaded server or as ASGI under uvicorn, and stops it
+    afterwards. Requests change the database as recorded, comments and
+    logins included, so run it against a disposable copy.
+    """
+    help: str = 'Replays a recorded request trace with concurrent clients.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('trace', help='Path of the JSONL trace.')
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Number of concurrent clients.')
+        parser.add_argument(
+            '--server', choices=['wsgi', 'asgi'], default='wsgi',
+            help='Server to start locally when --url is not given.')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of uvicorn worker processes for --server asgi.')
+        parser.add_argument(
+            '--url',
+            help='Base URL of an already running instance, e.g. http://127.0.0.1:8000.')
+        parser.add_argument(
+            '--speed', type=float, default=0.0,
+            help='Replay at the recorded pace times this factor; 0 sends as fast as possible.')
+        parser.add_argument(
+            '--repeat', type=int, default=1,
+            help='Number of times the trace is replayed, one replay after another.')
+        parser.add_argument(
+            '--password',
+            help='Password sent for redacted password fields of recorded logins.')
+        parser.add_argument(
+            '--username',
+            help='Username sent for redacted username fields of recorded logins.')
+        parser.add_argument(
+            '--timeout', type=float, default=30.0,
+            help='Timeout of a single request in seconds.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        try:
+            trace: List[dict] = read_trace(options['trace'])
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Cannot read trace: {error}')
+        if not trace:
+            raise CommandError('The trace is empty.')
+
+        process = None
+        base_url: Optional[str] = options['url']
+        if base_url is None:
+            port: int = free_port()
+            try:
+                process = start_server(options['server'], port, options['workers'], options['verbosity'] < 2)
+            except RuntimeError as error:
+                raise CommandError(str(error))
+            base_url = f'http://127.0.0.1:{port}'
+
+        try:
+            self.stdout.write(
+                f'Replaying {len(trace)} requests {options["repeat"]} times against {base_url} '
+                f'with {options["concurrency"]} clients')
+            report = LoadReport()
+            for _ in range(options['repeat']):
+                replay(
+                    trace, base_url, options['concurrency'], options['speed'],
+                    options['password'], options['timeout'], options['username'], report)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+        self.write_report(report)
+
+    def write_report(self, report: LoadReport) -> None:
+        self.stdout.write(
+            f'{"label":<24}{"requests":>9}{"errors":>8}{"p50 ms":>9}{"p90 ms":>9}'
+            f'{"p95 ms":>9}{"p99 ms":>9}{"max ms":>9}  statuses')
+        for label in sorted(report.latencies) + [None]:
+            summary: dict = report.summary(label)
+            statuses: str = ' '.join(f'{status}:{count}' for status, count in summary['statuses'].items())
+            self.stdout.write(
+                f'{label or "total":<24}{summary["requests"]:>9}{summary["error_rate"]:>8.1%}'
+                f'{summary["p50"]:>9.1f}{summary["p90"]:>9.1f}{summary["p95"]:>9.1f}'
+                f'{summary["p99"]:>9.1f}{summary["max"]:>9.1f}  {statuses}')
+        total: dict = report.summary()
+        self.stdout.write(self.style.SUCCESS(
+            f'{total["requests"]} requests in {report.finished - report.started:.2f}s, '
+            f'{total["throughput"]:.1f} req/s, error rate {total["error_rate"]:.1%}.'))
@@ -0,0 +1,121 @@
+import json
+import random
+from urllib.parse import urlencode
+from typing import Any, Callable, Dict, List, Tuple
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.shortcuts import reverse
+
+from blog.middleware import REDACTED
+from blog.models import Post, Tag
+
+
+class Command(BaseCommand):
+    """
+    Writes a synthetic JSONL trace for `loadtest` from the current database.
+
+    Visitors browse feed pages, search, read posts, open tag pages and feeds.
+    Visitors with one of the given usernames log in first and post comments.
+    Posts are read in proportion to their view counts, so popular posts
+    dominate as they do in real traffic.
+    """
+    help: str = 'Generates a mixed request trace from the posts and tags in the database.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('output', help='Path of the JSONL trace to write.')
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Approximate number of requests.')
+        parser.add_argument(
+            '--sessions', type=int, default=50,
+            help='Number of visitors.')
+        parser.add_argument(
+            '--duration', type=float, default=60.0,
+            help='Seconds over which visitors arrive.')
+        parser.add_argument(
+            '--users', nargs='*', default=[],
+            help='Existing usernames that log in and comment; passwords are written redacted.')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Seed of the random generator, for reproducible traces.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        self.random = random.Random(options['seed'])
+        self.posts: List[Tuple[str, str, int]] = list(Post.objects.values_list('slug', 'title', 'views'))
+        self.tags: List[str] = list(Tag.objects.values_list('slug', flat=True))
+        if not self.posts:
+            raise CommandError('There are no posts to build a trace from.')
+        self.pages: int = max(1, (len(self.posts) + 5) // 6)
+
+        actions: List[Tuple[Callable[[], dict], int]] = [
+            (self.feed_page, 30), (self.post_detail, 35), (self.search, 10),
+            (self.tag_page, 10), (self.feed, 5), (self.tags_list, 5),
+        ]
+        users: List[str] = options['users']
+        per_session: int = max(1, options['requests'] // options['sessions'])
+        trace: List[dict] = []
+
+        for session in range(options['sessions']):
+            t: float = self.random.uniform(0, options['duration'])
+            user: str = users[session % len(users)] if users and session % 3 == 0 else ''
+            entries: List[dict] = []
+            if user:
+                entries.append(self.login(user))
+            for _ in range(per_session - len(entries)):
+                if user and self.random.random() < 0.15:
+                    entries.append(self.comment())
+                else:
+                    action = self.random.choices(
+                        [action for action, _ in actions], [weight for _, weight in actions])[0]
+                    entries.append(action())
+            for entry in entries:
+                trace.append(dict(entry, t=round(t, 3), session=str(session)))
+                t += self.random.expovariate(0.5)
+
+        trace.sort(key=lambda entry: entry['t'])
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            for entry in trace:
+                output.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {len(trace)} requests of {options["sessions"]} sessions to {options["output"]}.'))
+
+    def get(self, label: str, path: str) -> dict:
+        return {'label': label, 'method': 'GET', 'path': path}
+
+    def popular_post(self) -> Tuple[str, str, int]:
+        return self.random.choices(self.posts, [views + 1 for _, _, views in self.posts])[0]
+
+    def feed_page(self) -> dict:
+        page: int = min(self.pages, int(self.random.expovariate(0.7)) + 1)
+        order: str = '&order=trending' if self.random.random() < 0.2 else ''
+        return self.get('posts_list_url', f'{reverse("posts_list_url")}?page={page}{order}')
+
+    def post_detail(self) -> dict:
+        return self.get('post_detail_url', reverse('post_detail_url', kwargs={'slug': self.popular_post()[0]}))
+
+    def search(self) -> dict:
+        words: List[str] = self.popular_post()[1].split() or ['blog']
+        query: str = self.random.choice(words)
+        return self.get('search', f'{reverse("posts_list_url")}?{urlencode({"search": query})}')
+
+    def tag_page(self) -> dict:
+        if not self.tags:
+            return self.tags_list()
+        return self.get('tag_detail_url', reverse('tag_detail_url', kwargs={'slug': self.random.choice(self.tags)}))
+
+    def tags_list(self) -> dict:
+        return self.get('tags_list_url', reverse('tags_list_url'))
+
+    def feed(self) -> dict:
+        feed_type: str = self.random.choice(['rss', 'atom'])
+        return self.get('posts_feed_url', reverse('posts_feed_url', kwargs={'feed_type': feed_type}))
+
+    def login(self, username: str) -> dict:
+        data: Dict[str, str] = {'username': username, 'password': REDACTED}
+        return {'label': 'login_url', 'method': 'POST', 'path': reverse('login_url'), 'data': data}
+
+    def comment(self) -> dict:
+        slug: str = self.popular_post()[0]
+        text: str = self.random.choice(['Спасибо!', 'Интересно.', 'Хороший пост.', 'А что дальше?'])
+        return {'label': 'add_comment', 'method': 'POST',
+                'path': reverse('add_comment', kwargs={'slug': slug}), 'data': {'text': text}}
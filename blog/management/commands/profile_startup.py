@@ -0,0 +1,83 @@
+import re
+from typing import Any, Dict, List, Tuple
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from blog.startup import ENTRY_POINTS, LOAD_URLCONF, run_python
+
+
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+class Command(BaseCommand):
+    """
+    Reports the import time of every module loaded when a worker boots.
+
+    The entry point is imported in a new interpreter with `-X importtime`,
+    followed by the URLconf, which workers load on their first request.
+    With several runs the fastest time of each module is reported, which
+    filters out noise from the disk cache and other processes.
+    """
+    help: str = 'Reports per-module import time of the WSGI or ASGI application.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--entry', choices=list(ENTRY_POINTS), default='wsgi',
+            help='Application entry point to import.')
+        parser.add_argument(
+            '--runs', type=int, default=3,
+            help='Number of interpreters to start; the fastest time of each module is kept.')
+        parser.add_argument(
+            '--top', type=int, default=30,
+            help='Number of modules to list.')
+        parser.add_argument(
+            '--sort', choices=['self', 'cumulative'], default='cumulative',
+            help='Order modules by their own import time or including the modules they import.')
+        parser.add_argument(
+            '--prefix', default='',
+            help='Only list modules whose name starts with this prefix, e.g. "blog".')
+        parser.add_argument(
+            '--no-urlconf', action='store_true',
+            help='Only import the entry point, without loading the URLconf.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        code: str = f'import {ENTRY_POINTS[options["entry"]]}'
+        if not options['no_urlconf']:
+            code += f'; {LOAD_URLCONF}'
+
+        timings: Dict[str, Tuple[int, int]] = {}
+        totals: List[int] = []
+        for _ in range(options['runs']):
+            run: Dict[str, Tuple[int, int]] = self.parse(run_python(code, '-X', 'importtime').stderr)
+            totals.append(sum(cumulative for name, (_, cumulative) in run.items() if name in self.roots))
+            for name, (own, cumulative) in run.items():
+                if name not in timings or cumulative < timings[name][1]:
+                    timings[name] = (own, cumulative)
+
+        column: int = 0 if options['sort'] == 'self' else 1
+        rows = sorted(
+            ((name, times) for name, times in timings.items() if name.startswith(options['prefix'])),
+            key=lambda row: row[1][column], reverse=True)
+
+        self.stdout.write(f'{"self ms":>10}{"cumul. ms":>11}  module')
+        for name, (own, cumulative) in rows[:options['top']]:
+            self.stdout.write(f'{own / 1000:>10.1f}{cumulative / 1000:>11.1f}  {name}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(timings)} modules imported, fastest run {min(totals) / 1000:.1f} ms '
+            f'of imports, slowest {max(totals) / 1000:.1f} ms.'))
+
+    def parse(self, output: str) -> Dict[str, Tuple[int, int]]:
+        """
+        Returns the self and cumulative import time in microseconds of each module.
+        """
+        timings: Dict[str, Tuple[int, int]] = {}
+        self.roots: List[str] = []
+        for line in output.splitlines():
+            match = IMPORT_TIME.match(line)
+            if match is None:
+                continue
+            own, cumulative, indent, name = match.groups()
+            timings[name] = (int(own), int(cumulative))
+            if len(indent) == 1:
+                self.roots.append(name)
+        return timings
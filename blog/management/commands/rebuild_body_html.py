@@ -0,0 +1,44 @@
+from typing import Any, List
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Re-renders the stored HTML, excerpt and word count of every post from its raw body.
+    """
+    help: str = 'Re-renders Post.body_html, excerpt and word_count from Post.body in batches.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of posts rendered and updated per transaction.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        batch_size: int = options['batch_size']
+        fields: List[str] = ['body_html', 'excerpt', 'word_count']
+        last_pk: int = 0
+        total: int = 0
+
+        while True:
+            posts: List[Post] = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .only('pk', 'body')[:batch_size]
+            )
+            if not posts:
+                break
+
+            for post in posts:
+                post.render_body_fields()
+            with transaction.atomic():
+                Post.objects.bulk_update(posts, fields)
+
+            last_pk = posts[-1].pk
+            total += len(posts)
+            self.stdout.write(f'Rendered {total} posts')
+
+        self.stdout.write(self.style.SUCCESS(f'Done, {total} posts rendered.'))
@@ -0,0 +1,34 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from blog.related import rebuild_related_posts
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the related posts of every post from the tag links with NumPy.
+
+    The table is kept up to date when tags change, so this is only needed
+    after imports or raw SQL changes that bypass the signals.
+    """
+    help: str = 'Rebuilds the RelatedPost table from tag co-occurrence.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--chunk-size', type=int, default=512,
+            help='Number of posts scored at a time.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            raise CommandError('rebuild_related_posts requires the numpy package.')
+
+        started: float = time.perf_counter()
+        created: int = rebuild_related_posts(
+            options['chunk_size'],
+            lambda done, total: self.stdout.write(f'Scored {done} of {total} posts'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {created} related post rows in {time.perf_counter() - started:.2f}s.'))
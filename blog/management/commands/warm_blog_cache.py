@@ -0,0 +1,118 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandParser
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Count
+from django.shortcuts import reverse
+from django.test import Client
+
+from blog.caching import WARMING_HEADER, warming_token
+from blog.models import Post, Tag
+
+
+class Command(BaseCommand):
+    """
+    Renders the pages first readers hit after a deploy and stores them in the page cache.
+
+    The pages are the newest pages of the post list, the most commented
+    posts, the tag list and every tag page. They are rendered concurrently
+    by a bounded thread pool, then requested once more to measure the hit
+    ratio. Pages are rendered in this process unless `--url` points to a
+    running instance; either way the cache has to be shared with the
+    workers, which the default local-memory cache is not. Requests carry a
+    token signed with SECRET_KEY, so the instance does not count them as
+    views; it has to use the same SECRET_KEY.
+    """
+    help: str = 'Pre-renders popular anonymous pages into the page cache.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--pages', type=int, default=5,
+            help='Number of newest post list pages to warm.')
+        parser.add_argument(
+            '--posts', type=int, default=50,
+            help='Number of most commented posts to warm.')
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Number of pages rendered at the same time.')
+        parser.add_argument(
+            '--url',
+            help='Warm a running instance over HTTP, e.g. http://127.0.0.1:8000.')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['url'] is None and isinstance(caches['default'], LocMemCache):
+            self.stderr.write(self.style.WARNING(
+                'The default cache is local memory, so pages warmed by this command '
+                'stay in this process. Set BLOG_CACHE_BACKEND to a shared cache, '
+                'or warm a running instance with --url.'))
+
+        self.url: Optional[str] = options['url'] and options['url'].rstrip('/')
+        self.host: str = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+        self.headers: dict = {WARMING_HEADER: warming_token()}
+        paths: List[str] = self.get_paths(options['pages'], options['posts'])
+
+        started: float = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency'], thread_name_prefix='cache-warming') as pool:
+            warmed: List[Tuple[int, str]] = list(pool.map(self.fetch, paths))
+        elapsed: float = time.perf_counter() - started
+
+        with ThreadPoolExecutor(options['concurrency'], thread_name_prefix='cache-warming') as pool:
+            checked: List[Tuple[int, str]] = list(pool.map(self.fetch, paths))
+        hits: int = sum(1 for _, state in checked if state == 'HIT')
+        failed: List[str] = [path for path, (status, _) in zip(paths, warmed) if status != 200]
+
+        for path in failed:
+            self.stderr.write(self.style.WARNING(f'Could not warm {path}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed {len(paths) - len(failed)} of {len(paths)} pages in {elapsed:.2f}s '
+            f'with {options["concurrency"]} threads, hit ratio afterwards '
+            f'{hits / len(paths) if paths else 0:.0%} ({hits}/{len(paths)}).'))
+
+    def get_paths(self, pages: int, posts: int) -> List[str]:
+        """
+        Returns the paths to warm, the most requested first.
+        """
+        list_url: str = reverse('posts_list_url')
+        paginator = Paginator(Post.objects.only('pk'), 6)
+        paths: List[str] = [list_url] + [
+            f'{list_url}?page={number}' for number in range(2, min(pages, paginator.num_pages) + 1)]
+        paths += [
+            reverse('post_detail_url', kwargs={'slug': slug})
+            for slug in Post.objects.annotate(comment_count=Count('comments'))
+            .order_by('-comment_count', '-date_pub').values_list('slug', flat=True)[:posts]
+        ]
+        paths.append(reverse('tags_list_url'))
+        paths += [
+            reverse('tag_detail_url', kwargs={'slug': slug})
+            for slug in Tag.objects.values_list('slug', flat=True)
+        ]
+        return paths
+
+    def fetch(self, path: str) -> Tuple[int, str]:
+        """
+        Requests a page as an anonymous visitor and returns the status and the X-Cache header.
+        """
+        if self.url is not None:
+            try:
+                request = Request(self.url + path, headers=self.headers)
+                with urlopen(request, timeout=30) as response:
+                    response.read()
+                    return response.status, response.headers.get('X-Cache', '')
+            except HTTPError as error:
+                return error.code, ''
+            except URLError:
+                return 0, ''
+
+        try:
+            response = Client(SERVER_NAME=self.host, headers=self.headers).get(path)
+            return response.status_code, response.get('X-Cache', '')
+        finally:
+            connection.close()
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import HttpRequest, HttpResponse
+
+from .hashers import HashingPoolBusy
+
+
+REDACTED: str = '<redacted>'
+PASSWORD_FIELDS: tuple = ('password', 'password1', 'password2')
+
+
+def session_digest(data: dict) -> str:
+    """
+    Returns a digest of session data that is stable across dict orderings.
+    """
+    return hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdleWriteSessionMixin:
+    """
+    Remembers what a session looked like when it was loaded.
+    """
+    _loaded_key: Optional[str] = None
+    _loaded_digest: Optional[str] = None
+
+    def load(self) -> dict:
+        data: dict = super().load()
+        self._loaded_key = self.session_key
+        self._loaded_digest = session_digest(data)
+        return data
+
+    def is_unchanged(self) -> bool:
+        """
+        Returns True if the session has the key and data it was loaded with.
+        """
+        return (
+            self._loaded_digest is not None
+            and self._loaded_key == self.session_key
+            and self._loaded_digest == session_digest(self._session)
+        )
+
+
+class IdleWriteSessionMiddleware(SessionMiddleware):
+    """
+    Session middleware that does not save sessions whose data did not change.
+
+    Django saves a session whenever it was marked as modified, even if the
+    same values were written back. This middleware compares the session with
+    the state it was loaded in and skips the write in that case.
+    """
+
+    def __init__(self, get_response: Any) -> None:
+        super().__init__(get_response)
+        # Sessions are signed with a salt derived from the store's __qualname__,
+        # which is kept so that existing sessions stay readable.
+        self.SessionStore = type(
+            'IdleWriteSessionStore', (IdleWriteSessionMixin, self.SessionStore),
+            {'__qualname__': self.SessionStore.__qualname__})
+
+    def process_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        session: Any = getattr(request, 'session', None)
+        if session is not None and session.modified and session.is_unchanged():
+            session.modified = False
+        return super().process_response(request, response)
+
+
+class HashingPoolBusyMiddleware:
+    """
+    Answers 503 Service Unavailable when password hashing is overloaded.
+
+    Covers every view that checks or sets a password, including the admin
+    login and password change views.
+    """
+    retry_after: int = 1
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        return self.get_response(request)
+
+    def process_exception(self, request: HttpRequest, exception: Exception) -> Optional[HttpResponse]:
+        if not isinstance(exception, HashingPoolBusy):
+            return None
+        response = HttpResponse('Сервер перегружен, попробуйте позже.', status=503)
+        response['Retry-After'] = str(self.retry_after)
+        return response
+
+
+class TraceRecorderMiddleware:
+    """
+    Appends every request to a JSONL trace that `loadtest` can replay.
+
+    Visitors are told apart by a random cookie rather than the session,
+    whose key changes on login. Form values, such as emails and comment
+    texts, are redacted unless BLOG_TRACE_FORM_VALUES is set; password
+    fields always are. Uploaded files are left out. Enabled by setting
+    BLOG_TRACE_FILE.
+    """
+    cookie_name: str = 'blog_trace'
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+        self.path: str = settings.BLOG_TRACE_FILE
+        self.keep_values: bool = settings.BLOG_TRACE_FORM_VALUES
+        self._lock = threading.Lock()
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        session: str = request.COOKIES.get(self.cookie_name) or secrets.token_hex(8)
+        entry: Dict[str, Any] = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'session': session,
+        }
+        if request.method == 'POST':
+            entry['data'] = {
+                key: value if self.keep_values and key not in PASSWORD_FIELDS else REDACTED
+                for key, value in request.POST.items() if key != 'csrfmiddlewaretoken'
+            }
+
+        response: HttpResponse = self.get_response(request)
+        match: Any = getattr(request, 'resolver_match', None)
+        entry['label'] = match.url_name if match is not None and match.url_name else request.method
+        entry['status'] = response.status_code
+        if self.cookie_name not in request.COOKIES:
+            response.set_cookie(self.cookie_name, session, httponly=True, samesite='Lax')
+        self.record(entry)
+        return response
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        # Wall clock time, so that traces of several worker processes can be merged.
+        entry['t'] = round(time.time(), 3)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as trace:
+                trace.write(json.dumps(entry, ensure_ascii=False) + '\n')
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.11 on 2026-10-19 00:08
+
+import base64
+from io import BytesIO
+
+from django.db import migrations, models
+
+
+# Frozen copy of blog.images.read_image_metadata as of this migration, so
+# later changes to the placeholder format do not change the backfill.
+PLACEHOLDER_WIDTH = 16
+PLACEHOLDER_BLUR_RADIUS = 2
+
+
+def read_image_metadata(file):
+    from PIL import Image, ImageFilter
+
+    file.seek(0)
+    with Image.open(file) as image:
+        width, height = image.size
+        thumbnail = image.convert("RGB")
+        thumbnail.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH))
+        thumbnail = thumbnail.filter(ImageFilter.GaussianBlur(PLACEHOLDER_BLUR_RADIUS))
+
+        buffer = BytesIO()
+        thumbnail.save(buffer, format="JPEG", quality=40)
+    file.seek(0)
+
+    encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
+    return width, height, f"data:image/jpeg;base64,{encoded}"
+
+
+def fill_image_metadata(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    posts = Post.objects.exclude(image="").exclude(image__isnull=True)
+    for post in posts.iterator():
+        try:
+            with post.image.open("rb") as image:
+                width, height, placeholder = read_image_metadata(image)
+        except (OSError, ValueError):
+            continue
+        Post.objects.filter(pk=post.pk).update(
+            image_width=width, image_height=height, image_placeholder=placeholder
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="image_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="image_placeholder",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="image_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_image_metadata, migrations.RunPython.noop),
+    ]
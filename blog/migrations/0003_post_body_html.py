@@ -0,0 +1,144 @@
+# Generated by Django 4.2.11 on 2026-10-19 00:20
+
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.db import migrations, models
+from django.utils.html import linebreaks
+
+
+# Frozen copy of blog.sanitizer.render_body as of this migration, so that
+# later changes to the allowlist do not change what this backfill produces.
+ALLOWED_TAGS = frozenset({
+    "a", "b", "blockquote", "br", "code", "div", "em", "figcaption", "figure",
+    "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img", "li", "ol", "p",
+    "pre", "s", "span", "strong", "sub", "sup", "table", "tbody", "td", "th",
+    "thead", "tr", "u", "ul",
+})
+
+VOID_TAGS = frozenset({"br", "hr", "img"})
+
+DROPPED_CONTENT_TAGS = frozenset({
+    "script", "style", "iframe", "object", "embed", "template", "noscript", "textarea", "select",
+})
+
+ALLOWED_ATTRIBUTES = {
+    "a": frozenset({"href", "title"}),
+    "img": frozenset({"src", "alt", "title", "width", "height"}),
+    "td": frozenset({"colspan", "rowspan"}),
+    "th": frozenset({"colspan", "rowspan"}),
+}
+
+IMPLICITLY_CLOSED = {
+    "li": frozenset({"li"}),
+    "p": frozenset({"p"}),
+    "td": frozenset({"td", "th"}),
+    "th": frozenset({"td", "th"}),
+    "tr": frozenset({"tr", "td", "th"}),
+}
+
+URL_ATTRIBUTES = frozenset({"href", "src"})
+
+ALLOWED_SCHEMES = frozenset({"", "http", "https", "mailto"})
+
+
+def is_safe_url(url):
+    cleaned = "".join(url.split()).lower()
+    try:
+        scheme = urlsplit(cleaned).scheme
+    except ValueError:
+        return False
+    return scheme in ALLOWED_SCHEMES
+
+
+class SanitizingParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.output = []
+        self.open_tags = []
+        self.dropped_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropped_depth += 1
+            return
+        if self.dropped_depth or tag not in ALLOWED_TAGS:
+            return
+
+        closed = IMPLICITLY_CLOSED.get(tag, frozenset())
+        while self.open_tags and self.open_tags[-1] in closed:
+            self.output.append(f"</{self.open_tags.pop()}>")
+
+        allowed = ALLOWED_ATTRIBUTES.get(tag, frozenset())
+        parts = [tag]
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not is_safe_url(value):
+                continue
+            parts.append(f'{name}="{escape(value)}"')
+        if tag == "a":
+            parts.append('rel="nofollow noopener"')
+
+        self.output.append(f"<{' '.join(parts)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropped_depth = max(self.dropped_depth - 1, 0)
+            return
+        if self.dropped_depth or tag not in self.open_tags:
+            return
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.output.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropped_depth:
+            self.output.append(escape(data, quote=False))
+
+    def get_html(self):
+        closing = [f"</{tag}>" for tag in reversed(self.open_tags)]
+        return "".join(self.output + closing)
+
+
+def render_body(raw):
+    if "<" not in raw:
+        return linebreaks(raw, autoescape=True)
+    parser = SanitizingParser()
+    parser.feed(raw)
+    parser.close()
+    return parser.get_html()
+
+
+def fill_body_html(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    posts = []
+    for post in Post.objects.only("pk", "body").iterator(chunk_size=500):
+        post.body_html = render_body(post.body)
+        posts.append(post)
+    Post.objects.bulk_update(posts, ["body_html"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0002_post_image_dimensions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="body_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_body_html, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.11 on 2026-10-19 00:35
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+
+# Frozen copy of blog.sanitizer.summarize as of this migration.
+EXCERPT_LENGTH = 300
+EXCERPT_WORDS = 40
+
+
+def summarize(body_html):
+    text = " ".join(strip_tags(body_html).split())
+    excerpt = Truncator(Truncator(text).words(EXCERPT_WORDS)).chars(EXCERPT_LENGTH)
+    return excerpt, len(text.split())
+
+
+def fill_summaries(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    posts = []
+    for post in Post.objects.only("pk", "body_html").iterator(chunk_size=500):
+        post.excerpt, post.word_count = summarize(post.body_html)
+        posts.append(post)
+    Post.objects.bulk_update(posts, ["excerpt", "word_count"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0003_post_body_html"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="excerpt",
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="word_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 4.2.11 on 2026-10-19 00:21
+
+from collections import Counter, defaultdict
+from math import sqrt
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+# Frozen copy of blog.related.score_pairs as of this migration.
+def score_pairs(links, post_ids, tag_counts):
+    tags_of = defaultdict(set)
+    posts_of = defaultdict(set)
+    for post_id, tag_id in links:
+        tags_of[post_id].add(tag_id)
+        posts_of[tag_id].add(post_id)
+
+    scores = {}
+    for post_id in post_ids:
+        shared = Counter()
+        for tag_id in tags_of.get(post_id, ()):
+            shared.update(posts_of[tag_id])
+        del shared[post_id]
+        for other_id, count in shared.items():
+            score = count / sqrt(tag_counts[post_id] * tag_counts[other_id])
+            scores[post_id, other_id] = scores[other_id, post_id] = score
+    return scores
+
+
+def fill_related_posts(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    RelatedPost = apps.get_model("blog", "RelatedPost")
+    through = Post.tags.through
+    links = list(through.objects.values_list("post_id", "tag_id"))
+    tag_counts = dict(
+        through.objects.values("post_id")
+        .annotate(count=Count("tag_id"))
+        .values_list("post_id", "count")
+    )
+    scores = score_pairs(links, tag_counts, tag_counts)
+    RelatedPost.objects.bulk_create(
+        [
+            RelatedPost(post_id=post_id, related_id=related_id, score=score)
+            for (post_id, related_id), score in scores.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0004_post_excerpt_word_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedPost",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.FloatField()),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_posts",
+                        to="blog.post",
+                    ),
+                ),
+                (
+                    "related",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_to",
+                        to="blog.post",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["post", "-score"], name="blog_relatedpost_score_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="relatedpost",
+            constraint=models.UniqueConstraint(
+                fields=("post", "related"), name="blog_relatedpost_unique"
+            ),
+        ),
+        migrations.RunPython(fill_related_posts, migrations.RunPython.noop),
+    ]
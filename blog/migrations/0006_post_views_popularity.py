@@ -0,0 +1,36 @@
+# Generated by Django 4.2.11 on 2026-10-19 00:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0005_relatedpost"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="popularity",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="views",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Просмотры"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["-views", "-date_pub"], name="blog_post_most_read_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["-popularity", "-date_pub"], name="blog_post_trending_idx"
+            ),
+        ),
+    ]
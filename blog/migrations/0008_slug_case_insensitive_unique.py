@@ -0,0 +1,50 @@
+# Generated by Django 4.2.11 on 2026-10-19 01:00
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+def lowercase_slugs(apps, schema_editor):
+    """
+    Lowercases the slugs of posts and tags. A slug that differs from an
+    existing one only in case gets the primary key appended, so that URLs
+    looked up case-insensitively match one object only.
+    """
+    for model_name in ("Post", "Tag"):
+        model = apps.get_model("blog", model_name)
+        max_length = model._meta.get_field("slug").max_length
+        slugs = dict(model.objects.values_list("pk", "slug"))
+        taken = {slug for slug in slugs.values() if slug == slug.lower()}
+        for pk, slug in sorted(slugs.items()):
+            if slug == slug.lower():
+                continue
+            new_slug = slug.lower()
+            while new_slug in taken:
+                suffix = f"-{pk}"
+                new_slug = new_slug[: max_length - len(suffix)] + suffix
+            taken.add(new_slug)
+            model.objects.filter(pk=pk).update(slug=new_slug)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0007_comment_created_at_default"),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_slugs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="post",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("slug"),
+                name="blog_post_slug_ci_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="tag",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("slug"),
+                name="blog_tag_slug_ci_unique",
+            ),
+        ),
+    ]
@@ -1,13 +1,24 @@
+from django.conf import settings
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 from django.shortcuts import reverse
+from django.templatetags.static import static
 from django.utils.text import slugify
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.utils import timezone
 from django.utils.timesince import timesince
 
-from typing import Type, Any
+from .images import read_image_metadata
+from .sanitizer import EXCERPT_LENGTH, render_body, summarize
+
+from typing import Type, Any, Callable, Dict, Optional
 from time import time
+from math import ceil
+
+
+WORDS_PER_MINUTE: int = 200
+COUNTER_FIELDS: tuple = ('views', 'popularity')
 
 
 def generate_slug(title: str) -> str:
@@ -18,6 +29,73 @@ def generate_slug(title: str) -> str:
     return new_slug + '-' + str(int(time()))
 
 
+class PostQuerySet(models.QuerySet):
+    """
+    Common queries for Post objects.
+    """
+
+    def for_feed(self) -> 'PostQuerySet':
+        """
+        Skip the heavy body columns, which list pages never display.
+        """
+        return self.defer('body', 'body_html')
+
+    def search(self, query: str) -> 'PostQuerySet':
+        """
+        Filter posts whose title or body contains the query.
+        """
+        return self.filter(
+            models.Q(title__icontains=query) |
+            models.Q(body__icontains=query)
+        )
+
+    def bulk_delete(self, progress: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, int]:
+        """
+        Delete the posts with their comments and tag links using set-based SQL.
+        """
+        from .bulk import delete_posts
+        return delete_posts(self, progress)
+
+    def most_read(self) -> 'PostQuerySet':
+        """
+        The BLOG_MOST_READ posts with the most views.
+        """
+        return self.filter(views__gt=0).order_by('-views', '-date_pub')[:settings.BLOG_MOST_READ]
+
+    def trending(self) -> 'PostQuerySet':
+        """
+        Order posts by their decayed popularity, most popular first.
+        """
+        return self.order_by('-popularity', '-date_pub')
+
+    def related_to(self, post: 'Post') -> 'PostQuerySet':
+        """
+        Posts related to the given post, most similar first, read from the
+        precomputed RelatedPost table with one indexed query.
+        """
+        return self.filter(related_to__post=post).order_by('-related_to__score', '-date_pub')
+
+
+class TagQuerySet(models.QuerySet):
+    """
+    Common queries for Tag objects.
+    """
+
+    def bulk_delete(self, progress: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, int]:
+        """
+        Delete the tags and their links to posts using set-based SQL.
+        """
+        from .bulk import delete_tags
+        return delete_tags(self, progress)
+
+    def merge_into(self, target: 'Tag') -> Dict[str, int]:
+        """
+        Move the posts of these tags to the target tag and delete the rest.
+        """
+        from .bulk import merge_tags
+        return merge_tags(self, target)
+
+
 class Post(models.Model):
     """
     A model representing a blog post.
@@ -26,20 +104,42 @@ class Post(models.Model):
         title (str): The title of the post, limited to 150 characters.
         slug (str): The URL-friendly slug for the post, derived from the title.
         body (str): The body of the post, which can include HTML.
+        body_html (str): The sanitized HTML of the body, rendered on save.
+        excerpt (str): A short plain-text summary of the body, rendered on save.
+        word_count (int): The number of words in the body, counted on save.
         tags (Type['Tag']): The tags associated with the post.
         date_pub (DateTimeField): The date and time the post was published.
+        image_width (int): The width of the image in pixels, filled on upload.
+        image_height (int): The height of the image in pixels, filled on upload.
+        image_placeholder (str): A data URI with a tiny blurred copy of the image.
+        views (int): The number of times the post was read.
+        popularity (float): The view count decayed over time, in log space.
     """
     title: str = models.CharField(
         max_length=150, db_index=True, verbose_name='Заголовок')
     slug: str = models.SlugField(
         max_length=150, blank=True, unique=True, verbose_name='URL')
     body: str = models.TextField(blank=True, db_index=True)
+    body_html: str = models.TextField(blank=True, editable=False)
+    excerpt: str = models.CharField(
+        max_length=EXCERPT_LENGTH, blank=True, editable=False)
+    word_count: int = models.PositiveIntegerField(default=0, editable=False)
     tags: Type['Tag'] = models.ManyToManyField(
         'Tag', blank=True, related_name='posts', verbose_name='Теги')
     image: InMemoryUploadedFile = models.ImageField(
         upload_to='images', blank=True, null=True)
+    image_width: int = models.PositiveIntegerField(
+        blank=True, null=True, editable=False)
+    image_height: int = models.PositiveIntegerField(
+        blank=True, null=True, editable=False)
+    image_placeholder: str = models.TextField(blank=True, editable=False)
     date_pub: models.DateTimeField = models.DateTimeField(
         auto_now_add=True, verbose_name='Дата публикации')
+    views: int = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Просмотры')
+    popularity: float = models.FloatField(default=0, editable=False)
+
+    objects: PostQuerySet = PostQuerySet.as_manager()
 
     def get_absolute_url(self: 'Post') -> str:
         """
@@ -66,14 +166,57 @@ class Post(models.Model):
         if self.image:
             return self.image.url
         else:
-            return '/static/images/default.png'
+            return static('images/default.png')
+
+    @property
+    def reading_time(self: 'Post') -> int:
+        """
+        Return the estimated reading time of this post in minutes.
+        """
+        return max(1, ceil(self.word_count / WORDS_PER_MINUTE))
+
+    def render_body_fields(self: 'Post') -> None:
+        """
+        Render the raw body into sanitized HTML, an excerpt and a word count,
+        so that views never have to.
+        """
+        self.body_html = render_body(self.body)
+        self.excerpt, self.word_count = summarize(self.body_html)
+
+    def update_image_metadata(self: 'Post') -> None:
+        """
+        Store the dimensions and the blurred placeholder of the attached image,
+        so that templates never have to open the image file.
+        """
+        if self.image:
+            try:
+                self.image_width, self.image_height, self.image_placeholder = \
+                    read_image_metadata(self.image.file)
+                return
+            except (OSError, ValueError):
+                # Pillow raises UnidentifiedImageError, an OSError, for files
+                # it cannot read; the post is saved without the metadata.
+                pass
+        self.image_width = self.image_height = None
+        self.image_placeholder = ''
 
     def save(self: 'Post', *args: Any, **kwargs: Any) -> None:
         """
         Save this post to the database, generating a slug if one is not provided.
+        Slugs are stored in lower case, as URLs look them up case-insensitively.
         """
         if not self.id:
             self.slug = generate_slug(self.title)
+        self.slug = self.slug.lower()
+        self.render_body_fields()
+        if not self.image or not self.image._committed:
+            self.update_image_metadata()
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            # The counters are only written by the view counter, never from a stale copy.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+            ]
         super().save(*args, **kwargs)
 
     def __str__(self: 'Post') -> str:
@@ -84,6 +227,13 @@ class Post(models.Model):
 
     class Meta:
         ordering: list = ['-date_pub']
+        indexes: list = [
+            models.Index(fields=['-views', '-date_pub'], name='blog_post_most_read_idx'),
+            models.Index(fields=['-popularity', '-date_pub'], name='blog_post_trending_idx'),
+        ]
+        constraints: list = [
+            models.UniqueConstraint(Lower('slug'), name='blog_post_slug_ci_unique'),
+        ]
         verbose_name: str = 'Посты'
         verbose_name_plural: str = 'Посты'
 
@@ -96,7 +246,8 @@ class Comment(models.Model):
         post (Post): A foreign key to the related Post object.
         author (User): A foreign key to the related User object.
         text (str): The text of the comment.
-        created_at (datetime): The date and time when the comment was created.
+        created_at (datetime): The date and time when the comment was submitted,
+            kept when a queued comment is written later.
 
     Methods:
         __str__(): Returns a string representation of the comment.
@@ -106,7 +257,8 @@ class Comment(models.Model):
     author: models.ForeignKey = models.ForeignKey(
         User, on_delete=models.CASCADE)
     text: models.TextField = models.TextField()
-    created_at: models.DateTimeField = models.DateTimeField(auto_now_add=True)
+    created_at: models.DateTimeField = models.DateTimeField(
+        default=timezone.now, editable=False)
 
     def time_since_created(self):
         """
@@ -139,6 +291,8 @@ class Tag(models.Model):
     slug: str = models.SlugField(
         max_length=50, unique=True, verbose_name='URL')
 
+    objects: TagQuerySet = TagQuerySet.as_manager()
+
     def get_absolute_url(self: 'Tag') -> str:
         """
         Return the URL to access a detail view for this tag.
@@ -157,6 +311,14 @@ class Tag(models.Model):
         """
         return reverse('tag_delete_url', kwargs={'slug': self.slug})
 
+    def save(self: 'Tag', *args: Any, **kwargs: Any) -> None:
+        """
+        Save this tag to the database with its slug in lower case, as URLs
+        look tags up case-insensitively.
+        """
+        self.slug = self.slug.lower()
+        super().save(*args, **kwargs)
+
     def __str__(self: 'Tag') -> str:
         """
         Return a string representation of this tag.
@@ -165,5 +327,41 @@ class Tag(models.Model):
 
     class Meta:
         ordering: list = ['title']
+        constraints: list = [
+            models.UniqueConstraint(Lower('slug'), name='blog_tag_slug_ci_unique'),
+        ]
         verbose_name: str = 'Теги'
         verbose_name_plural: str = 'Теги'
+
+
+class RelatedPost(models.Model):
+    """
+    A precomputed similarity between two posts that share at least one tag.
+
+    Rows are stored in both directions, so the related posts of a post are
+    read by `post` alone. Posts without common tags have no row.
+
+    Attributes:
+        post (Post): The post the recommendation is shown on.
+        related (Post): The recommended post.
+        score (float): The cosine similarity of the tag sets of both posts.
+    """
+    post: models.ForeignKey = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='related_posts')
+    related: models.ForeignKey = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='related_to')
+    score: float = models.FloatField()
+
+    def __str__(self: 'RelatedPost') -> str:
+        """
+        Return a string representation of this similarity.
+        """
+        return f'{self.post_id} -> {self.related_id}: {self.score:.3f}'
+
+    class Meta:
+        constraints: list = [
+            models.UniqueConstraint(fields=['post', 'related'], name='blog_relatedpost_unique'),
+        ]
+        indexes: list = [
+            models.Index(fields=['post', '-score'], name='blog_relatedpost_score_idx'),
+        ]
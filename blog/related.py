@@ -0,0 +1,145 @@
+"""
+Related posts based on tag co-occurrence.
+
+Two posts are related when they share a tag. Their score is the cosine
+similarity of their binary tag vectors: the number of shared tags divided
+by the geometric mean of both tag counts. Scores are kept in the
+RelatedPost table, so the detail page reads them instead of self-joining
+the tag links on every view.
+
+When the tags of a post change, only pairs including that post change
+score, so `refresh_related_posts` recomputes just those rows.
+`rebuild_related_posts` recomputes the whole table with NumPy and is run
+by the management command of the same name.
+"""
+import logging
+from collections import Counter, defaultdict
+from math import sqrt
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Post, RelatedPost
+
+
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[int, int]
+
+
+def score_pairs(links: Iterable[Pair], post_ids: Iterable[int],
+                tag_counts: Dict[int, int]) -> Dict[Pair, float]:
+    """
+    Returns the scores of all pairs that include one of the given posts.
+
+    `links` are (post_id, tag_id) rows covering every tag of the given posts,
+    `tag_counts` maps each post appearing in them to its number of tags.
+    Pairs are returned in both directions.
+    """
+    tags_of: Dict[int, Set[int]] = defaultdict(set)
+    posts_of: Dict[int, Set[int]] = defaultdict(set)
+    for post_id, tag_id in links:
+        tags_of[post_id].add(tag_id)
+        posts_of[tag_id].add(post_id)
+
+    scores: Dict[Pair, float] = {}
+    for post_id in post_ids:
+        shared: Counter = Counter()
+        for tag_id in tags_of.get(post_id, ()):
+            shared.update(posts_of[tag_id])
+        del shared[post_id]
+        for other_id, count in shared.items():
+            score: float = count / sqrt(tag_counts[post_id] * tag_counts[other_id])
+            scores[post_id, other_id] = scores[other_id, post_id] = score
+    return scores
+
+
+def refresh_related_posts(post_ids: Iterable[int]) -> int:
+    """
+    Recomputes the related posts of the given posts, whose tags have changed,
+    and returns the number of stored rows.
+    """
+    through: Any = Post.tags.through
+    post_ids = sorted(set(post_ids))
+    batch_size: int = settings.BLOG_BULK_BATCH_SIZE
+    created: int = 0
+
+    with transaction.atomic():
+        for start in range(0, len(post_ids), batch_size):
+            batch: List[int] = post_ids[start:start + batch_size]
+            tags = through.objects.filter(post_id__in=batch).values('tag_id')
+            links: List[Pair] = list(
+                through.objects.filter(tag_id__in=tags).values_list('post_id', 'tag_id'))
+            candidates = through.objects.filter(tag_id__in=tags).values('post_id')
+            tag_counts: Dict[int, int] = dict(
+                through.objects.filter(post_id__in=candidates)
+                .values('post_id').annotate(count=Count('tag_id')).values_list('post_id', 'count'))
+
+            scores: Dict[Pair, float] = score_pairs(links, batch, tag_counts)
+            RelatedPost.objects.filter(post_id__in=batch).delete()
+            RelatedPost.objects.filter(related_id__in=batch).delete()
+            RelatedPost.objects.bulk_create(
+                [RelatedPost(post_id=post_id, related_id=related_id, score=score)
+                 for (post_id, related_id), score in scores.items()],
+                batch_size=batch_size)
+            created += len(scores)
+    return created
+
+
+def rebuild_related_posts(chunk_size: int = 512,
+                          progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """
+    Recomputes the whole RelatedPost table and returns the number of rows.
+
+    The tag links are indexed twice, by post and by tag, as sorted arrays
+    with offsets (the CSR layout of the sparse post-tag matrix). For a chunk
+    of posts, every link is expanded to the posts of its tag, and counting
+    the resulting pairs gives the shared tag counts, which are divided by
+    the geometric mean of both tag counts. Memory grows with the number of
+    co-occurring pairs in a chunk, not with posts times tags.
+    """
+    import numpy as np
+
+    through: Any = Post.tags.through
+    links = np.array(list(through.objects.values_list('post_id', 'tag_id')), dtype=np.int64).reshape(-1, 2)
+    post_ids, rows = np.unique(links[:, 0], return_inverse=True)
+    tag_ids, columns = np.unique(links[:, 1], return_inverse=True)
+    rows, columns = rows.reshape(-1), columns.reshape(-1)
+
+    post_counts = np.bincount(rows, minlength=len(post_ids))
+    post_offsets = np.concatenate(([0], np.cumsum(post_counts)))
+    by_post = np.argsort(rows, kind='stable')
+    post_rows, post_columns = rows[by_post], columns[by_post]
+
+    tag_offsets = np.concatenate(([0], np.cumsum(np.bincount(columns, minlength=len(tag_ids)))))
+    tag_rows = rows[np.argsort(columns, kind='stable')]
+    norms = np.sqrt(post_counts.astype(np.float64))
+    batch_size: int = settings.BLOG_BULK_BATCH_SIZE
+    created: int = 0
+
+    with transaction.atomic():
+        RelatedPost.objects.all()._raw_delete(RelatedPost.objects.db)
+        for start in range(0, len(post_ids), chunk_size):
+            stop: int = min(start + chunk_size, len(post_ids))
+            chunk = slice(post_offsets[start], post_offsets[stop])
+            # Pair every link of the chunk with all posts that have the same tag.
+            tags = post_columns[chunk]
+            sizes = tag_offsets[tags + 1] - tag_offsets[tags]
+            shifts = np.repeat(tag_offsets[tags] - np.cumsum(sizes) + sizes, sizes)
+            left = np.repeat(post_rows[chunk], sizes)
+            right = tag_rows[shifts + np.arange(len(shifts))]
+            others = left != right
+            pairs, shared = np.unique(left[others] * len(post_ids) + right[others], return_counts=True)
+            chunk_rows, related_rows = np.divmod(pairs, len(post_ids))
+            scores = shared / (norms[chunk_rows] * norms[related_rows])
+            RelatedPost.objects.bulk_create(
+                [RelatedPost(post_id=int(post_ids[row]), related_id=int(post_ids[related]), score=float(score))
+                 for row, related, score in zip(chunk_rows, related_rows, scores)],
+                batch_size=batch_size)
+            created += len(pairs)
+            logger.info('related posts: %d of %d posts', stop, len(post_ids))
+            if progress is not None:
+                progress(stop, len(post_ids))
+    return created
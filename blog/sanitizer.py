@@ -0,0 +1,153 @@
+from html import escape
+from html.parser import HTMLParser
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from django.utils.html import linebreaks, strip_tags
+from django.utils.text import Truncator
+
+
+EXCERPT_LENGTH: int = 300
+EXCERPT_WORDS: int = 40
+
+ALLOWED_TAGS: FrozenSet[str] = frozenset({
+    'a', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p',
+    'pre', 's', 'span', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th',
+    'thead', 'tr', 'u', 'ul',
+})
+
+VOID_TAGS: FrozenSet[str] = frozenset({'br', 'hr', 'img'})
+
+# Tags whose content is dropped together with the tag itself.
+DROPPED_CONTENT_TAGS: FrozenSet[str] = frozenset({
+    'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript', 'textarea', 'select',
+})
+
+ALLOWED_ATTRIBUTES: Dict[str, FrozenSet[str]] = {
+    'a': frozenset({'href', 'title'}),
+    'img': frozenset({'src', 'alt', 'title', 'width', 'height'}),
+    'td': frozenset({'colspan', 'rowspan'}),
+    'th': frozenset({'colspan', 'rowspan'}),
+}
+
+# Tags that implicitly close an open sibling of the listed kinds, as in <li>a<li>b.
+IMPLICITLY_CLOSED: Dict[str, FrozenSet[str]] = {
+    'li': frozenset({'li'}),
+    'p': frozenset({'p'}),
+    'td': frozenset({'td', 'th'}),
+    'th': frozenset({'td', 'th'}),
+    'tr': frozenset({'tr', 'td', 'th'}),
+}
+
+URL_ATTRIBUTES: FrozenSet[str] = frozenset({'href', 'src'})
+
+ALLOWED_SCHEMES: FrozenSet[str] = frozenset({'', 'http', 'https', 'mailto'})
+
+
+def is_safe_url(url: str) -> bool:
+    """
+    Checks that a link or image address does not use a scriptable scheme.
+    """
+    cleaned: str = ''.join(url.split()).lower()
+    try:
+        scheme: str = urlsplit(cleaned).scheme
+    except ValueError:
+        return False
+    return scheme in ALLOWED_SCHEMES
+
+
+class SanitizingParser(HTMLParser):
+    """
+    Re-serializes HTML keeping only allowlisted tags and attributes.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.output: List[str] = []
+        self.open_tags: List[str] = []
+        self.dropped_depth: int = 0
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropped_depth += 1
+            return
+        if self.dropped_depth or tag not in ALLOWED_TAGS:
+            return
+
+        closed: FrozenSet[str] = IMPLICITLY_CLOSED.get(tag, frozenset())
+        while self.open_tags and self.open_tags[-1] in closed:
+            self.output.append(f'</{self.open_tags.pop()}>')
+
+        allowed: FrozenSet[str] = ALLOWED_ATTRIBUTES.get(tag, frozenset())
+        parts: List[str] = [tag]
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not is_safe_url(value):
+                continue
+            parts.append(f'{name}="{escape(value)}"')
+        if tag == 'a':
+            parts.append('rel="nofollow noopener"')
+
+        self.output.append(f'<{" ".join(parts)}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropped_depth = max(self.dropped_depth - 1, 0)
+            return
+        if self.dropped_depth or tag not in self.open_tags:
+            return
+        while self.open_tags:
+            open_tag: str = self.open_tags.pop()
+            self.output.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        if not self.dropped_depth:
+            self.output.append(escape(data, quote=False))
+
+    def get_html(self) -> str:
+        """
+        Returns the sanitized HTML with all still open tags closed.
+        """
+        closing: List[str] = [f'</{tag}>' for tag in reversed(self.open_tags)]
+        return ''.join(self.output + closing)
+
+
+def sanitize_html(raw: str) -> str:
+    """
+    Returns HTML with everything outside of the allowlist removed.
+    """
+    parser = SanitizingParser()
+    parser.feed(raw)
+    parser.close()
+    return parser.get_html()
+
+
+def render_body(raw: str) -> str:
+    """
+    Renders the raw body of a post into safe HTML.
+
+    Bodies without any markup are treated as plain text and split into paragraphs.
+    """
+    if '<' not in raw:
+        return linebreaks(raw, autoescape=True)
+    return sanitize_html(raw)
+
+
+def summarize(body_html: str) -> Tuple[str, int]:
+    """
+    Returns a plain-text excerpt and the word count of rendered body HTML.
+    """
+    text: str = ' '.join(strip_tags(body_html).split())
+    excerpt: str = Truncator(Truncator(text).words(EXCERPT_WORDS)).chars(EXCERPT_LENGTH)
+    return excerpt, len(text.split())
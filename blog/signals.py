@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from typing import Any, Iterable, List
+
+from .caching import CONTENT_FAMILY, POSTS_FEED_FAMILY, SITEMAP_FAMILY, invalidate_families, tag_feed_family
+from .models import Comment, Post, Tag
+from .related import refresh_related_posts
+
+
+def invalidate_on_commit(families: Iterable[str]) -> None:
+    """
+    Invalidates cached documents once the current transaction is committed,
+    so that they are never rebuilt from data that is not visible yet.
+    Every change also invalidates the content family.
+    """
+    families = [CONTENT_FAMILY, *families]
+    transaction.on_commit(lambda: invalidate_families(families))
+
+
+def post_families(slugs: Iterable[str]) -> List[str]:
+    """
+    Returns the document families showing a post with the given tag slugs.
+    """
+    return [POSTS_FEED_FAMILY, SITEMAP_FAMILY] + [tag_feed_family(slug) for slug in slugs]
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender: Any, instance: Post, created: bool, **kwargs: Any) -> None:
+    slugs = [] if created else instance.tags.values_list('slug', flat=True)
+    invalidate_on_commit(post_families(slugs))
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleted(sender: Any, instance: Post, **kwargs: Any) -> None:
+    # The tags of the post are gone after the delete, so collect them now.
+    invalidate_on_commit(post_families(instance.tags.values_list('slug', flat=True)))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed(sender: Any, instance: Any, action: str, reverse: bool, pk_set: Any, **kwargs: Any) -> None:
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        slugs = [instance.slug]
+    elif action == 'pre_clear':
+        slugs = instance.tags.values_list('slug', flat=True)
+    else:
+        slugs = Tag.objects.filter(pk__in=pk_set).values_list('slug', flat=True)
+    invalidate_on_commit(tag_feed_family(slug) for slug in slugs)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_related(sender: Any, instance: Any, action: str, reverse: bool, pk_set: Any, **kwargs: Any) -> None:
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_related_posts([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        refresh_related_posts(pk_set)
+    elif action == 'pre_clear':
+        instance._cleared_post_ids = list(instance.posts.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        refresh_related_posts(getattr(instance, '_cleared_post_ids', []))
+
+
+@receiver(pre_save, sender=Tag)
+def tag_saving(sender: Any, instance: Tag, **kwargs: Any) -> None:
+    # Remember the old slug, so that feeds under a renamed address are dropped too.
+    instance._old_slug = None
+    if instance.pk:
+        instance._old_slug = Tag.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender: Any, instance: Tag, **kwargs: Any) -> None:
+    slugs = {instance.slug, getattr(instance, '_old_slug', None) or instance.slug}
+    invalidate_on_commit([SITEMAP_FAMILY] + [tag_feed_family(slug) for slug in slugs])
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender: Any, instance: Tag, **kwargs: Any) -> None:
+    # The links are deleted without m2m_changed, so remember the tagged posts.
+    instance._deleted_post_ids = list(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender: Any, instance: Tag, **kwargs: Any) -> None:
+    invalidate_on_commit([SITEMAP_FAMILY, tag_feed_family(instance.slug)])
+    refresh_related_posts(getattr(instance, '_deleted_post_ids', []))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender: Any, instance: Comment, **kwargs: Any) -> None:
+    invalidate_on_commit([])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender: Any, instance: Comment, **kwargs: Any) -> None:
+    invalidate_on_commit([])
@@ -0,0 +1,35 @@
+from django.contrib.sitemaps import Sitemap
+from typing import Any, List
+
+from .models import Post, Tag
+
+
+class PostSitemap(Sitemap):
+    """
+    Sitemap section listing every post.
+    """
+    changefreq: str = 'weekly'
+    priority: float = 0.8
+
+    def items(self) -> List[Post]:
+        return Post.objects.only('slug', 'date_pub').order_by('pk')
+
+    def lastmod(self, obj: Post) -> Any:
+        return obj.date_pub
+
+
+class TagSitemap(Sitemap):
+    """
+    Sitemap section listing every tag.
+    """
+    changefreq: str = 'weekly'
+    priority: float = 0.5
+
+    def items(self) -> List[Tag]:
+        return Tag.objects.only('slug').order_by('pk')
+
+
+SITEMAPS: dict = {
+    'posts': PostSitemap,
+    'tags': TagSitemap,
+}
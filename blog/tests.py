@@ -1,3 +1,959 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import random
+import subprocess
+import tempfile
+import threading
+from datetime import timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from typing import Any, List
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.admin.models import CHANGE, DELETION, LogEntry
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError
+from django.forms import ModelForm
+from django.http import HttpResponse
+from django.test import (
+    LiveServerTestCase, RequestFactory, TestCase, TransactionTestCase, modify_settings, override_settings,
+)
+from django.utils import timezone
+from PIL import Image
+
+from blog_engine.static_handler import PrecompressedStaticHandler, parse_accept_encoding
+
+from .api import ApiError, decode_cursor, encode_cursor
+from .bulk import rename_tag
+from .caching import (
+    CONTENT_FAMILY, POSTS_FEED_FAMILY, SITEMAP_FAMILY, WARMING_HEADER, family_version, invalidate_families,
+    tag_feed_family, warming_token,
+)
+from .comment_queue import CommentWriteBehind
+from .forms import PostForm, TagForm
+from .hashers import (
+    HashingPool, HashingPoolBusy, PooledPBKDF2PasswordHasher, PooledScryptPasswordHasher, hashing_pool,
+)
+from .loadtest import FILLER, LoadReport, TraceClient, percentile, read_trace, replay
+from .management.commands.profile_startup import Command as ProfileStartupCommand
+from .middleware import REDACTED, IdleWriteSessionMiddleware, TraceRecorderMiddleware
+from .models import WORDS_PER_MINUTE, Comment, Post, RelatedPost, Tag
+from .related import rebuild_related_posts, refresh_related_posts
+from .sanitizer import EXCERPT_LENGTH, EXCERPT_WORDS, render_body, sanitize_html, summarize
+from .startup import run_python
+from .throttling import TokenBucket
+from .view_counter import ViewCounter, add_views, view_counter
+
+
+def encode(value: Any) -> str:
+    """
+    Encodes a value the way API cursors are encoded, without checking it.
+    """
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def streamed_json(response: Any) -> dict:
+    return json.loads(b''.join(response.streaming_content))
+
+
+class SanitizerTests(TestCase):
+    """
+    Post bodies are rendered into HTML that cannot run scripts.
+    """
+
+    def assertSafe(self, raw: str) -> str:
+        html: str = sanitize_html(raw).lower()
+        for marker in ('<script', 'javascript:', 'onerror', 'onload', 'onmouseover', '<iframe', '<svg',
+                       '<style', 'data:', 'vbscript:'):
+            self.assertNotIn(marker, html, raw)
+        return html
+
+    def test_script_content_is_dropped(self) -> None:
+        self.assertEqual(sanitize_html('<p>a<script>alert(1)</script>b</p>'), '<p>ab</p>')
+        self.assertEqual(sanitize_html('<scr<script>ipt>alert(1)</script>'), 'ipt&gt;alert(1)')
+
+    def test_event_handler_attributes_are_dropped(self) -> None:
+        self.assertEqual(sanitize_html('<img src="x.png" onerror="alert(1)">'), '<img src="x.png">')
+        self.assertSafe('<svg onload=alert(1)><p onmouseover="alert(1)">x</p></svg>')
+
+    def test_scriptable_urls_are_dropped(self) -> None:
+        for href in ('javascript:alert(1)', 'JaVaScRiPt:alert(1)', ' javascript:alert(1)',
+                     'jav&#x09;ascript:alert(1)', 'java\nscript:alert(1)', 'javascript&colon;alert(1)',
+                     'vbscript:msgbox(1)', 'data:text/html;base64,PHNjcmlwdD4='):
+            html: str = self.assertSafe(f'<a href="{href}">x</a>')
+            self.assertNotIn('href', html)
+
+    def test_safe_urls_are_kept(self) -> None:
+        self.assertEqual(
+            sanitize_html('<a href="https://example.com/?a=1&amp;b=2">x</a>'),
+            '<a href="https://example.com/?a=1&amp;b=2" rel="nofollow noopener">x</a>')
+        self.assertEqual(sanitize_html('<img src="/images/a.png" alt="a">'), '<img src="/images/a.png" alt="a">')
+
+    def test_attribute_values_cannot_break_out(self) -> None:
+        html: str = sanitize_html('<a title=\'" onmouseover="alert(1)\'>x</a>')
+        self.assertEqual(html, '<a title="&quot; onmouseover=&quot;alert(1)" rel="nofollow noopener">x</a>')
+
+    def test_dangerous_containers_are_dropped(self) -> None:
+        for raw in ('<iframe src="https://evil"></iframe>', '<style>body{}</style>',
+                    '<object data="x"></object>', '<template><script>x</script></template>',
+                    '<textarea><script>alert(1)</script></textarea>'):
+            self.assertEqual(sanitize_html(raw), '', raw)
+
+    def test_comments_and_unclosed_tags(self) -> None:
+        self.assertEqual(sanitize_html('<!--<script>x</script>--><b>bold'), '<b>bold</b>')
+        self.assertEqual(sanitize_html('<ul><li>a<li>b</ul>'), '<ul><li>a</li><li>b</li></ul>')
+
+    def test_text_is_escaped(self) -> None:
+        self.assertEqual(sanitize_html('<p>1 &lt; 2 &amp;&amp; <i>x</i></p>'), '<p>1 &lt; 2 &amp;&amp; <i>x</i></p>')
+        self.assertEqual(render_body('a & b\n\nc'), '<p>a &amp; b</p>\n\n<p>c</p>')
+
+    def test_post_save_renders_body(self) -> None:
+        post: Post = Post.objects.create(title='Sanitized', body='<p onclick="x()">Hello <script>1</script>world</p>')
+        self.assertEqual(post.body_html, '<p>Hello world</p>')
+        self.assertEqual((post.excerpt, post.word_count), ('Hello world', 2))
+
+
+class SlugTests(TestCase):
+
+    def test_slugs_are_stored_in_lower_case(self) -> None:
+        self.assertEqual(Tag.objects.create(title='Django', slug='Django').slug, 'django')
+        post: Post = Post.objects.create(title='Post')
+        post.slug = 'Mixed-Case'
+        post.save()
+        self.assertEqual(Post.objects.values_list('slug', flat=True).get(pk=post.pk), 'mixed-case')
+
+    def test_slugs_differing_in_case_are_rejected(self) -> None:
+        Tag.objects.create(title='Django', slug='django')
+        form = TagForm({'title': 'Django', 'slug': 'DJANGO'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('slug', form.errors)
+        with self.assertRaises(IntegrityError):
+            Tag.objects.bulk_create([Tag(title='Django', slug='Django')])
+
+    def test_own_slug_is_not_a_conflict(self) -> None:
+        tag: Tag = Tag.objects.create(title='Django', slug='django')
+        form = TagForm({'title': 'Renamed', 'slug': 'Django'}, instance=tag)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save().title, 'Renamed')
+
+    def test_reserved_slugs_are_rejected(self) -> None:
+        self.assertIn('slug', TagForm({'title': 'Create', 'slug': 'Create'}).errors)
+        post: Post = Post.objects.create(title='Post')
+        self.assertIn('slug', PostForm({'title': 'Post', 'slug': 'create', 'body': 'x'}, instance=post).errors)
+
+    def test_concurrently_taken_slug_is_a_form_error(self) -> None:
+        form = TagForm({'title': 'Django', 'slug': 'django'})
+        self.assertTrue(form.is_valid())
+        Tag.objects.create(title='Other', slug='Django')
+        self.assertIsNone(form.save())
+        self.assertIn('slug', form.errors)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_other_integrity_errors_are_raised(self) -> None:
+        form = TagForm({'title': 'Django', 'slug': 'django'})
+        self.assertTrue(form.is_valid())
+        with mock.patch.object(ModelForm, 'save', side_effect=IntegrityError('NOT NULL constraint failed')):
+            with self.assertRaises(IntegrityError):
+                form.save()
+
+    def test_migration_lowercases_existing_slugs(self) -> None:
+        migration = import_module('blog.migrations.0008_slug_case_insensitive_unique')
+        Tag.objects.bulk_create([Tag(title='Django', slug='Django'), Tag(title='Python', slug='python')])
+        migration.lowercase_slugs(apps, None)
+        self.assertEqual(sorted(Tag.objects.values_list('slug', flat=True)), ['django', 'python'])
+
+
+class SummaryTests(TestCase):
+
+    def test_excerpt_is_plain_text(self) -> None:
+        self.assertEqual(summarize('<p>Hello <b>bold</b>\n world</p>\n\n<p>again</p>'), ('Hello bold world again', 4))
+
+    def test_excerpt_is_truncated(self) -> None:
+        excerpt, words = summarize(' '.join(['word'] * (EXCERPT_WORDS * 2)))
+        self.assertEqual(words, EXCERPT_WORDS * 2)
+        self.assertEqual(len(excerpt.split()), EXCERPT_WORDS)
+        self.assertTrue(excerpt.endswith('…'))
+        excerpt, words = summarize('x' * (EXCERPT_LENGTH * 2))
+        self.assertEqual((len(excerpt), words), (EXCERPT_LENGTH, 1))
+
+    def test_reading_time(self) -> None:
+        for words, minutes in ((0, 1), (WORDS_PER_MINUTE, 1), (WORDS_PER_MINUTE + 1, 2)):
+            self.assertEqual(Post(word_count=words).reading_time, minutes, words)
+
+    def test_save_updates_summary(self) -> None:
+        post: Post = Post.objects.create(title='Summary', body='one two')
+        post.body = 'one two three'
+        post.save()
+        self.assertEqual(Post.objects.values_list('excerpt', 'word_count').get(pk=post.pk), ('one two three', 3))
+
+    def test_feed_defers_body(self) -> None:
+        Post.objects.create(title='Feed', body='long body')
+        post: Post = Post.objects.for_feed().get()
+        self.assertEqual(post.get_deferred_fields(), {'body', 'body_html'})
+        with self.assertNumQueries(0):
+            self.assertEqual((post.excerpt, post.word_count), ('long body', 2))
+
+
+class ImageMetadataTests(TestCase):
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def upload(self, content: bytes) -> SimpleUploadedFile:
+        return SimpleUploadedFile('photo.png', content, content_type='image/png')
+
+    def png(self, width: int, height: int) -> bytes:
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), (200, 40, 40)).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def test_save_stores_dimensions_and_placeholder(self) -> None:
+        post: Post = Post.objects.create(title='Photo', image=self.upload(self.png(64, 48)))
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (64, 48))
+        self.assertTrue(post.image_placeholder.startswith('data:image/jpeg;base64,'))
+
+    def test_saving_again_keeps_metadata(self) -> None:
+        post: Post = Post.objects.create(title='Photo', image=self.upload(self.png(32, 32)))
+        post = Post.objects.get(pk=post.pk)
+        with mock.patch('blog.models.read_image_metadata') as read:
+            post.title = 'Renamed'
+            post.save()
+        read.assert_not_called()
+        self.assertEqual((post.image_width, post.image_height), (32, 32))
+
+    def test_unreadable_image_is_saved_without_metadata(self) -> None:
+        post: Post = Post.objects.create(title='Broken', image=self.upload(b'not an image'))
+        post.refresh_from_db()
+        self.assertTrue(post.image)
+        self.assertEqual((post.image_width, post.image_height, post.image_placeholder), (None, None, ''))
+
+    def test_removing_the_image_clears_metadata(self) -> None:
+        post: Post = Post.objects.create(title='Photo', image=self.upload(self.png(16, 8)))
+        post.image = None
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height, post.image_placeholder), (None, None, ''))
+
+
+class PostModelTests(TestCase):
+
+    def test_explicit_primary_key_inserts(self) -> None:
+        post = Post(pk=4242, title='Explicit')
+        post.save()
+        self.assertTrue(Post.objects.filter(pk=4242).exists())
+
+    def test_save_does_not_overwrite_counters(self) -> None:
+        post: Post = Post.objects.create(title='Counters')
+        Post.objects.filter(pk=post.pk).update(views=10)
+        post.title = 'Renamed'
+        post.save()
+        self.assertEqual(Post.objects.values_list('title', 'views').get(pk=post.pk), ('Renamed', 10))
+
+
+class ApiTests(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = User.objects.create(username='reader')
+        self.post: Post = Post.objects.create(title='Api post')
+        for number in range(3):
+            Post.objects.create(title=f'Other {number}')
+        self.comments: List[Comment] = [
+            Comment.objects.create(post=self.post, author=self.user, text=str(number)) for number in range(3)
+        ]
+        self.comments_url: str = f'/blog/api/posts/{self.post.slug}/comments/'
+
+    def test_cursor_round_trip(self) -> None:
+        first: dict = streamed_json(self.client.get('/blog/api/posts/?limit=2&fields=title'))
+        second: dict = streamed_json(self.client.get(f'/blog/api/posts/?limit=2&fields=title&cursor={first["next"]}'))
+        titles: List[str] = [item['title'] for item in first['results'] + second['results']]
+        self.assertEqual(titles, list(Post.objects.values_list('title', flat=True)))
+        self.assertIsNone(second['next'])
+
+    def test_comment_cursor_round_trip(self) -> None:
+        first: dict = streamed_json(self.client.get(f'{self.comments_url}?limit=2'))
+        second: dict = streamed_json(self.client.get(f'{self.comments_url}?limit=2&cursor={first["next"]}'))
+        self.assertEqual([item['text'] for item in first['results'] + second['results']], ['0', '1', '2'])
+
+    def test_tampered_cursors_are_rejected(self) -> None:
+        for cursor in (encode(['garbage', 1]), encode(['2024-01-01T00:00:00', 1]),
+                       encode(['2024-01-01T00:00:00+00:00', True]), encode(['2024-01-01T00:00:00+00:00', 2 ** 70]),
+                       encode(['2024-01-01T00:00:00+00:00', '1']), encode({'a': 1}), encode([1]), '@@@', 'e30'):
+            for url in ('/blog/api/posts/', self.comments_url):
+                response = self.client.get(url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 400, (url, cursor))
+                self.assertEqual(response.json(), {'error': 'Invalid cursor.'})
+        self.assertEqual(self.client.get('/blog/api/tags/', {'cursor': encode(['a', 1])}).status_code, 400)
+
+    def test_decode_cursor(self) -> None:
+        value = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(value, 5), type(value)), (value, 5))
+        self.assertEqual(decode_cursor(encode_cursor(7, 7)), (7, 7))
+        with self.assertRaises(ApiError):
+            decode_cursor(encode([-1, 1]))
+
+    def test_errors(self) -> None:
+        self.assertEqual(self.client.get('/blog/api/posts/?limit=x').json(), {'error': 'Invalid limit.'})
+        response = self.client.get('/blog/api/posts/?fields=nope')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Unknown fields: nope.', response.json()['error'])
+        self.assertEqual(self.client.get('/blog/api/posts/missing/comments/').status_code, 404)
+        self.assertEqual(self.client.get('/blog/api/posts/missing/').status_code, 404)
+
+    def test_etag_changes_with_content(self) -> None:
+        etag: str = self.client.get(self.comments_url)['ETag']
+        self.assertEqual(self.client.get(self.comments_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comments[0].delete()
+        response = self.client.get(self.comments_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(streamed_json(response)['results']), 2)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, author=self.user, text='new')
+        self.assertNotEqual(self.client.get(self.comments_url)['ETag'], etag)
+
+
+class DocumentCacheTests(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.tag: Tag = Tag.objects.create(title='Django', slug='django')
+        self.post: Post = Post.objects.create(title='Feed post', body='Feed body')
+        self.post.tags.add(self.tag)
+        self.families: List[str] = [CONTENT_FAMILY, POSTS_FEED_FAMILY, SITEMAP_FAMILY, tag_feed_family('django')]
+
+    def changed_families(self, change: Any) -> List[str]:
+        before: List[int] = [family_version(family) for family in self.families]
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        return [family for family, version in zip(self.families, before) if family_version(family) != version]
+
+    def test_documents_are_served(self) -> None:
+        for url, content_type, text in (
+                ('/blog/feed/rss/', 'application/rss+xml', 'Feed post'),
+                ('/blog/feed/atom/', 'application/atom+xml', 'Feed post'),
+                ('/blog/tag/django/feed/rss/', 'application/rss+xml', 'Feed post'),
+                ('/blog/tag/Django/feed/atom/', 'application/atom+xml', 'Feed post'),
+                ('/blog/sitemap.xml', 'application/xml', self.post.get_absolute_url())):
+            response = self.client.get(url)
+            self.assertTrue(response['Content-Type'].startswith(content_type), url)
+            self.assertContains(response, text, msg_prefix=url)
+        self.assertEqual(self.client.get('/blog/feed/json/').status_code, 404)
+        self.assertEqual(self.client.get('/blog/tag/missing/feed/rss/').status_code, 404)
+
+    def test_conditional_requests(self) -> None:
+        etag: str = self.client.get('/blog/feed/rss/')['ETag']
+        response = self.client.get('/blog/feed/rss/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(title='Newer post')
+        response = self.client.get('/blog/feed/rss/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Newer post')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_changes_invalidate_their_families(self) -> None:
+        def rename_post() -> None:
+            self.post.title = 'Renamed'
+            self.post.save()
+
+        self.assertEqual(self.changed_families(rename_post), self.families)
+        self.assertEqual(
+            self.changed_families(lambda: Comment.objects.create(
+                post=self.post, author=User.objects.create(username='reader'), text='hi')),
+            [CONTENT_FAMILY])
+        self.assertEqual(
+            self.changed_families(lambda: self.post.tags.remove(self.tag)), [CONTENT_FAMILY, tag_feed_family('django')])
+        self.assertEqual(
+            self.changed_families(lambda: self.tag.posts.add(self.post)), [CONTENT_FAMILY, tag_feed_family('django')])
+        self.assertEqual(self.changed_families(self.post.delete), self.families)
+        self.assertEqual(
+            self.changed_families(self.tag.delete), [CONTENT_FAMILY, SITEMAP_FAMILY, tag_feed_family('django')])
+
+    def test_evicted_versions_are_not_reused(self) -> None:
+        version: int = family_version(POSTS_FEED_FAMILY)
+        invalidate_families([POSTS_FEED_FAMILY])
+        self.assertEqual(family_version(POSTS_FEED_FAMILY), version + 1)
+
+        cache.delete(f'blog:family:{POSTS_FEED_FAMILY}')
+        self.assertGreater(family_version(POSTS_FEED_FAMILY), version + 1)
+        version = family_version(POSTS_FEED_FAMILY)
+        cache.delete(f'blog:family:{POSTS_FEED_FAMILY}')
+        invalidate_families([POSTS_FEED_FAMILY])
+        self.assertGreater(family_version(POSTS_FEED_FAMILY), version)
+
+
+class ThrottlingTests(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_token_bucket_refills(self) -> None:
+        bucket = TokenBucket(rate=1.0, capacity=2, prefix='test')
+        with mock.patch('blog.throttling.time.time', return_value=1000.0):
+            self.assertEqual([bucket.consume('a') for _ in range(3)], [True, True, False])
+            self.assertTrue(bucket.consume('b'))
+        with mock.patch('blog.throttling.time.time', return_value=1001.5):
+            self.assertEqual([bucket.consume('a') for _ in range(2)], [True, False])
+
+    @override_settings(BLOG_COMMENT_BURST=2, BLOG_COMMENT_RATE=1)
+    def test_comments_are_throttled(self) -> None:
+        user: User = User.objects.create(username='writer')
+        post: Post = Post.objects.create(title='Throttled')
+        self.client.force_login(user)
+        url: str = f'/blog/post/{post.slug}/comment/'
+        statuses: List[int] = [self.client.post(url, {'text': 'hi'}).status_code for _ in range(3)]
+        self.assertEqual(statuses, [302, 302, 429])
+        self.assertEqual(Comment.objects.filter(post=post).count(), 2)
+
+
+class HashingPoolTests(TestCase):
+
+    def test_runs_jobs_and_counts_them(self) -> None:
+        pool = HashingPool(workers=1, queue_size=0, timeout=1)
+        self.assertEqual(pool.run(lambda value: value * 2, 3), 6)
+        self.assertEqual(pool.run(lambda: pool.run(lambda: 'nested')), 'nested')
+        self.assertEqual((pool.stats()['completed'], pool.stats()['rejected']), (2, 0))
+        with self.assertLogs('blog.hashers', 'INFO'):
+            self.assertEqual(pool.log_stats(), 2)
+        self.assertEqual(pool.log_stats(), 0)
+
+    def test_full_pool_rejects(self) -> None:
+        pool = HashingPool(workers=1, queue_size=0, timeout=0.05)
+        started, release = threading.Event(), threading.Event()
+
+        def hold() -> None:
+            started.set()
+            release.wait(5)
+
+        worker = threading.Thread(target=pool.run, args=(hold,))
+        worker.start()
+        self.addCleanup(worker.join)
+        self.addCleanup(release.set)
+        started.wait(5)
+        with self.assertLogs('blog.hashers', 'WARNING'), self.assertRaises(HashingPoolBusy):
+            pool.run(lambda: None)
+        self.assertEqual(pool.stats()['rejected'], 1)
+
+
+@override_settings(PASSWORD_HASHERS=['blog.hashers.PooledScryptPasswordHasher',
+                                     'blog.hashers.PooledPBKDF2PasswordHasher'])
+class PasswordHasherTests(TestCase):
+
+    def setUp(self) -> None:
+        for patcher in (mock.patch.object(PooledPBKDF2PasswordHasher, 'iterations', 1000),
+                        mock.patch.object(PooledScryptPasswordHasher, 'work_factor', 2 ** 10),
+                        mock.patch.object(hashing_pool, '_reporter', None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_hashers_run_on_the_pool(self) -> None:
+        for hasher in (PooledPBKDF2PasswordHasher(), PooledScryptPasswordHasher()):
+            completed: float = hashing_pool.stats()['completed']
+            encoded: str = hasher.encode('secret', hasher.salt())
+            self.assertTrue(hasher.verify('secret', encoded))
+            self.assertFalse(hasher.verify('wrong', encoded))
+            self.assertEqual(hashing_pool.stats()['completed'], completed + 3)
+
+    def test_login_rehashes_with_the_configured_profile(self) -> None:
+        hasher = PooledPBKDF2PasswordHasher()
+        User.objects.create(username='old', password=hasher.encode('secret', hasher.salt()))
+        response = self.client.post('/blog/login/', {'username': 'old', 'password': 'secret'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(User.objects.get(username='old').password.startswith('scrypt$'))
+
+    def test_busy_pool_answers_503(self) -> None:
+        User.objects.create_user(username='busy', password='secret')
+        with mock.patch.object(hashing_pool, 'run', side_effect=HashingPoolBusy):
+            for url in ('/blog/login/', '/admin/login/'):
+                response = self.client.post(url, {'username': 'busy', 'password': 'secret'})
+                self.assertEqual(response.status_code, 503, url)
+                self.assertEqual(response['Retry-After'], '1')
+
+
+class CommentWriteBehindTests(TransactionTestCase):
+    """
+    Runs without a wrapping transaction, so foreign keys are checked on commit.
+    """
+
+    def setUp(self) -> None:
+        self.user: User = User.objects.create(username='queued')
+        self.queue = CommentWriteBehind()
+        self.queue._flusher = mock.Mock()
+
+    def test_flush_writes_batch(self) -> None:
+        post: Post = Post.objects.create(title='Queued')
+        for number in range(3):
+            self.queue.submit(Comment(post=post, author=self.user, text=str(number)))
+        self.assertEqual(len(self.queue.pending_for(post.pk, self.user.pk)), 3)
+        self.assertEqual(self.queue.flush(), 3)
+        self.assertEqual(self.queue.pending_for(post.pk, self.user.pk), [])
+        self.assertEqual(Comment.objects.filter(post=post).count(), 3)
+
+    def test_flush_keeps_submit_time(self) -> None:
+        post: Post = Post.objects.create(title='Timed')
+        comment = Comment(post=post, author=self.user, text='early')
+        self.queue.submit(comment)
+        submitted = comment.created_at
+        with mock.patch('django.db.models.fields.timezone.now', return_value=timezone.now() + timedelta(minutes=5)):
+            self.queue.flush()
+        self.assertEqual(Comment.objects.get(post=post).created_at, submitted)
+
+    def test_failed_row_does_not_drop_batch(self) -> None:
+        kept: Post = Post.objects.create(title='Kept')
+        deleted: Post = Post.objects.create(title='Deleted')
+        for post, text in ((kept, 'a'), (deleted, 'b'), (kept, 'c')):
+            self.queue.submit(Comment(post_id=post.pk, author=self.user, text=text))
+        Post.objects.filter(pk=deleted.pk).delete()
+
+        with self.assertLogs('blog.comment_queue', 'WARNING'):
+            self.assertEqual(self.queue.flush(), 2)
+        self.assertEqual(sorted(Comment.objects.values_list('text', flat=True)), ['a', 'c'])
+
+    def test_locked_database_requeues(self) -> None:
+        post: Post = Post.objects.create(title='Locked')
+        self.queue.submit(Comment(post=post, author=self.user, text='retry'))
+        with mock.patch.object(Comment.objects, 'bulk_create', side_effect=OperationalError('locked')):
+            with self.assertRaises(OperationalError):
+                self.queue.flush()
+        self.assertEqual(len(self.queue.pending_for(post.pk, self.user.pk)), 1)
+        self.assertEqual(self.queue.flush(), 1)
+
+
+class ViewCounterTests(TestCase):
+
+    def test_flushes_of_several_counters_add_up(self) -> None:
+        post: Post = Post.objects.create(title='Counted')
+        first, second = ViewCounter(), ViewCounter()
+        now = timezone.now()
+        expected: float = 0.0
+        with mock.patch('blog.view_counter.timezone.now', return_value=now):
+            for counter, views in ((first, 3), (second, 5), (first, 2)):
+                counter._flusher = mock.Mock()
+                for _ in range(views):
+                    counter.hit(post.pk)
+                counter.hit(post.pk + 1000)
+                self.assertEqual(counter.flush(), 1)
+                expected = add_views(expected, views, now)
+        post.refresh_from_db()
+        self.assertEqual(post.views, 10)
+        self.assertAlmostEqual(post.popularity, expected)
+
+    def test_trending_prefers_recent_views(self) -> None:
+        old: Post = Post.objects.create(title='Old')
+        new: Post = Post.objects.create(title='New')
+        now = timezone.now()
+        Post.objects.filter(pk=old.pk).update(popularity=add_views(0, 10, now - timedelta(days=10)))
+        Post.objects.filter(pk=new.pk).update(popularity=add_views(0, 2, now))
+        self.assertEqual(list(Post.objects.trending()), [new, old])
+
+
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=300)
+class PageCacheTests(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = User.objects.create(username='visitor')
+        self.post: Post = Post.objects.create(title='Cached')
+        self.tag: Tag = Tag.objects.create(title='Cached', slug='cached')
+        patcher = mock.patch.object(view_counter, '_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(view_counter._pending.clear)
+
+    def test_anonymous_pages_are_cached(self) -> None:
+        for url in ('/blog/', self.post.get_absolute_url(), '/blog/tags/', self.tag.get_absolute_url()):
+            self.assertEqual(self.client.get(url)['X-Cache'], 'MISS', url)
+            self.assertEqual(self.client.get(url)['X-Cache'], 'HIT', url)
+
+    def test_unused_parameters_share_an_entry(self) -> None:
+        self.assertEqual(self.client.get('/blog/')['X-Cache'], 'MISS')
+        for query in ('?page=1', '?junk=1', '?page=1&utm=x', '?order=other'):
+            self.assertEqual(self.client.get('/blog/' + query)['X-Cache'], 'HIT', query)
+        self.assertEqual(self.client.get('/blog/?order=trending')['X-Cache'], 'MISS')
+
+    def test_non_canonical_pages_are_not_stored(self) -> None:
+        for query in ('?page=abc', '?page=99', '?page=01'):
+            self.assertEqual(self.client.get('/blog/' + query)['X-Cache'], 'MISS', query)
+            self.assertEqual(self.client.get('/blog/' + query)['X-Cache'], 'MISS', query)
+
+    def test_content_change_invalidates(self) -> None:
+        url: str = self.post.get_absolute_url()
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, author=self.user, text='fresh comment')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'fresh comment')
+
+    def test_logged_in_pages_are_not_cached(self) -> None:
+        self.client.force_login(self.user)
+        self.assertNotIn('X-Cache', self.client.get('/blog/'))
+
+    def test_views_are_counted_on_hits(self) -> None:
+        url: str = self.post.get_absolute_url()
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(view_counter.pending()[self.post.pk], 2)
+
+    def test_only_signed_warming_requests_skip_counting(self) -> None:
+        url: str = self.post.get_absolute_url()
+        self.client.get(url, headers={WARMING_HEADER: '1'})
+        self.client.get(url, headers={WARMING_HEADER: 'forged:token'})
+        self.client.get(url, headers={WARMING_HEADER: warming_token()})
+        self.assertEqual(view_counter.pending()[self.post.pk], 2)
+
+
+class BulkOperationTests(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = User.objects.create(username='editor')
+        self.tags: dict = {slug: Tag.objects.create(title=slug.upper(), slug=slug) for slug in ('a', 'b', 'c')}
+        self.posts: List[Post] = []
+        for number, slugs in enumerate(('ab', 'a', 'bc')):
+            post: Post = Post.objects.create(title=f'Post {number}')
+            post.tags.set([self.tags[slug] for slug in slugs])
+            Comment.objects.create(post=post, author=self.user, text='comment')
+            self.posts.append(post)
+
+    def related(self) -> dict:
+        return {(row.post_id, row.related_id): round(row.score, 3) for row in RelatedPost.objects.all()}
+
+    def test_delete_posts(self) -> None:
+        first, second, third = self.posts
+        stages: List[tuple] = []
+        versions: List[int] = [family_version(POSTS_FEED_FAMILY), family_version(tag_feed_family('a'))]
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted = Post.objects.filter(pk__in=[first.pk, second.pk]).bulk_delete(
+                lambda *args: stages.append(args))
+        self.assertEqual(deleted, {'posts': 2, 'comments': 2})
+        self.assertEqual(list(Post.objects.all()), [third])
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Post.tags.through.objects.count(), 2)
+        self.assertEqual(self.related(), {})
+        self.assertEqual(stages[-1], ('posts', 2, 2))
+        self.assertNotEqual([family_version(POSTS_FEED_FAMILY), family_version(tag_feed_family('a'))], versions)
+
+    def test_delete_tags(self) -> None:
+        first, second, third = self.posts
+        version: int = family_version(tag_feed_family('a'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Tag.objects.filter(slug='a').bulk_delete(), {'tags': 1, 'links': 2})
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(self.related(), {(first.pk, third.pk): 0.707, (third.pk, first.pk): 0.707})
+        self.assertNotEqual(family_version(tag_feed_family('a')), version)
+
+    def test_merge_tags(self) -> None:
+        target: Tag = self.tags['c']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Tag.objects.all().merge_into(target), {'tags': 2, 'links': 2})
+        self.assertEqual(list(Tag.objects.all()), [target])
+        self.assertEqual(target.posts.count(), 3)
+        self.assertEqual(set(self.related().values()), {1.0})
+        self.assertEqual(len(self.related()), 6)
+
+    def test_rename_tag(self) -> None:
+        tag: Tag = self.tags['a']
+        versions: List[int] = [family_version(tag_feed_family('a')), family_version(tag_feed_family('renamed'))]
+        with self.captureOnCommitCallbacks(execute=True):
+            rename_tag(tag, 'Renamed', 'renamed')
+        self.assertEqual(Tag.objects.values_list('title', 'slug').get(pk=tag.pk), ('Renamed', 'renamed'))
+        self.assertNotEqual(versions[0], family_version(tag_feed_family('a')))
+        self.assertNotEqual(versions[1], family_version(tag_feed_family('renamed')))
+
+    def test_admin_actions_are_logged(self) -> None:
+        admin: User = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        response = self.client.post('/admin/blog/post/', {
+            'action': 'bulk_delete', '_selected_action': [post.pk for post in self.posts[:2]],
+        }, follow=True)
+        self.assertContains(response, 'Удалено постов: 2, комментариев: 2.')
+        self.assertEqual(
+            sorted(LogEntry.objects.filter(action_flag=DELETION).values_list('object_repr', flat=True)),
+            ['Post 0', 'Post 1'])
+
+        self.client.post('/admin/blog/tag/', {
+            'action': 'merge', 'apply': '1', 'target': self.tags['c'].pk,
+            '_selected_action': [tag.pk for tag in self.tags.values()],
+        })
+        self.assertEqual(
+            sorted(LogEntry.objects.filter(action_flag=DELETION).values_list('object_repr', flat=True)),
+            ['A', 'B', 'Post 0', 'Post 1'])
+        self.assertTrue(LogEntry.objects.filter(object_id=str(self.tags['c'].pk), action_flag=CHANGE).exists())
+
+
+class RelatedPostTests(TestCase):
+
+    def scores(self) -> dict:
+        return {(row.post_id, row.related_id): row.score for row in RelatedPost.objects.all()}
+
+    def test_refresh_matches_rebuild(self) -> None:
+        generator = random.Random(37)
+        tags: List[Tag] = [Tag.objects.create(title=f'Tag {number}', slug=f'tag-{number}') for number in range(8)]
+        posts: List[Post] = [Post.objects.create(title=f'Post {number}') for number in range(30)]
+        for post in posts:
+            post.tags.set(generator.sample(tags, generator.randint(0, 4)))
+        refreshed: dict = self.scores()
+
+        RelatedPost.objects.all().delete()
+        self.assertEqual(rebuild_related_posts(chunk_size=7), len(refreshed))
+        rebuilt: dict = self.scores()
+        self.assertEqual(rebuilt.keys(), refreshed.keys())
+        for pair, score in refreshed.items():
+            self.assertAlmostEqual(rebuilt[pair], score, places=6, msg=pair)
+
+        refresh_related_posts([post.pk for post in posts])
+        self.assertEqual(self.scores(), refreshed)
+
+    def test_scores(self) -> None:
+        first, second, third = (Post.objects.create(title=title) for title in ('First', 'Second', 'Third'))
+        a, b, c = (Tag.objects.create(title=slug, slug=slug) for slug in 'abc')
+        self.assertEqual(rebuild_related_posts(), 0)
+        first.tags.set([a, b])
+        second.tags.set([a, b, c])
+        third.tags.set([c])
+        rebuild_related_posts()
+        self.assertEqual(list(Post.objects.related_to(second)), [first, third])
+        self.assertAlmostEqual(self.scores()[first.pk, second.pk], 2 / (2 * 3) ** 0.5)
+        self.assertNotIn((first.pk, third.pk), self.scores())
+        self.assertEqual(rebuild_related_posts(), 4)
+
+
+class IdleWriteSessionTests(TestCase):
+
+    def setUp(self) -> None:
+        self.values: dict = {}
+        self.middleware = IdleWriteSessionMiddleware(self.view)
+        session = self.middleware.SessionStore()
+        session.update({'theme': 'dark'})
+        session.create()
+        self.session_key: str = session.session_key
+
+    def view(self, request: Any) -> HttpResponse:
+        request.session.update(self.values)
+        return HttpResponse()
+
+    def request(self, **values: Any) -> HttpResponse:
+        self.values = values
+        request = RequestFactory().get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = self.session_key
+        with mock.patch.object(self.middleware.SessionStore, 'save', autospec=True,
+                               side_effect=self.middleware.SessionStore.save) as save:
+            response = self.middleware(request)
+        self.saves: int = save.call_count
+        return response
+
+    def test_unchanged_session_is_not_written(self) -> None:
+        response = self.request(theme='dark')
+        self.assertEqual(self.saves, 0)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_changed_session_is_written(self) -> None:
+        response = self.request(theme='light')
+        self.assertEqual(self.saves, 1)
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertEqual(self.middleware.SessionStore(self.session_key).load(), {'theme': 'light'})
+
+    def test_new_key_is_written(self) -> None:
+        def view(request: Any) -> HttpResponse:
+            request.session.cycle_key()
+            return HttpResponse()
+
+        self.middleware.get_response = view
+        response = self.request()
+        self.assertGreater(self.saves, 0)
+        self.assertNotEqual(response.cookies[settings.SESSION_COOKIE_NAME].value, self.session_key)
+
+    def test_existing_sessions_stay_readable(self) -> None:
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        self.assertEqual(store(self.session_key).load(), {'theme': 'dark'})
+
+
+class StartupTests(TestCase):
+    """
+    Smoke tests of the boot measurements, which start new interpreters.
+    """
+
+    def test_run_python(self) -> None:
+        self.assertEqual(run_python('import os; print(os.environ["DJANGO_SETTINGS_MODULE"])').stdout.strip(),
+                         os.environ.get('DJANGO_SETTINGS_MODULE', 'blog_engine.settings'))
+        with self.assertRaises(subprocess.CalledProcessError):
+            run_python('raise SystemExit(1)')
+
+    def test_parse_import_times(self) -> None:
+        output: str = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |     blog.models\n'
+            'import time:       300 |        420 |   blog.urls\n'
+            'import time:        80 |        500 | blog_engine.wsgi\n'
+        )
+        command = ProfileStartupCommand()
+        self.assertEqual(command.parse(output), {
+            'blog.models': (120, 120), 'blog.urls': (300, 420), 'blog_engine.wsgi': (80, 500),
+        })
+        self.assertEqual(command.roots, ['blog_engine.wsgi'])
+
+    def test_profile_startup(self) -> None:
+        out = StringIO()
+        call_command('profile_startup', runs=1, top=100, prefix='blog', stdout=out)
+        output: str = out.getvalue()
+        self.assertIn('blog_engine.wsgi', output)
+        self.assertIn('blog.views', output)
+        self.assertIn('modules imported', output)
+
+    def test_bench_boot(self) -> None:
+        # The path does not exist, so the first request does not need the database.
+        for entry in ('wsgi', 'asgi'):
+            out = StringIO()
+            call_command('bench_boot', entry=entry, runs=1, path='/favicon.ico', stdout=out)
+            output: str = out.getvalue()
+            self.assertIn(f'{entry} boot, 1 runs, first request to /favicon.ico answered with 404', output)
+            for phase in ('import', 'urlconf', 'first_request', 'wall'):
+                self.assertRegex(output, rf'\n{phase} +\d', entry)
+
+
+class LoadTestTests(TestCase):
+
+    def test_read_trace(self) -> None:
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as trace:
+            trace.write('{"t": 100.5, "path": "/b"}\n\n{"t": 100, "path": "/a"}\n')
+        self.addCleanup(os.remove, trace.name)
+        self.assertEqual(read_trace(trace.name), [{'t': 0, 'path': '/a'}, {'t': 0.5, 'path': '/b'}])
+
+    def test_report(self) -> None:
+        self.assertEqual((percentile([1, 2, 3, 4], 50), percentile([1, 2, 3, 4], 99), percentile([], 50)),
+                         (2, 4, 0.0))
+        report = LoadReport()
+        for label, status, latency in (('a', 200, 0.01), ('a', 500, 0.03), ('b', 0, 0.02), ('b', 302, 0.04)):
+            report.add(label, status, latency)
+        report.finish()
+        summary: dict = report.summary()
+        self.assertEqual((summary['requests'], summary['error_rate']), (4, 0.5))
+        self.assertEqual(summary['statuses'], {0: 1, 200: 1, 302: 1, 500: 1})
+        self.assertAlmostEqual(summary['max'], 40)
+        self.assertEqual(report.summary('a')['statuses'], {200: 1, 500: 1})
+
+    def test_redacted_values_are_replaced(self) -> None:
+        client = TraceClient('http://testserver/', 'secret', 1, username='reader')
+        self.assertEqual([client.unredact(field) for field in ('password', 'password2', 'username', 'text')],
+                         ['secret', 'secret', 'reader', FILLER])
+        self.assertEqual(TraceClient('http://testserver', None, 1).unredact('password'), FILLER)
+
+
+class TraceRecorderTests(TestCase):
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path: str = os.path.join(directory.name, 'trace.jsonl')
+
+    def record(self, keep_values: bool) -> dict:
+        with override_settings(BLOG_TRACE_FILE=self.path, BLOG_TRACE_FORM_VALUES=keep_values):
+            middleware = TraceRecorderMiddleware(lambda request: HttpResponse(status=302))
+        request = RequestFactory().post('/blog/login/', {
+            'username': 'reader', 'password': 'secret', 'text': 'hello', 'csrfmiddlewaretoken': 'token',
+        })
+        response = middleware(request)
+        self.assertIn(TraceRecorderMiddleware.cookie_name, response.cookies)
+        return read_trace(self.path)[-1]
+
+    def test_form_values_are_redacted(self) -> None:
+        entry: dict = self.record(keep_values=False)
+        self.assertEqual(entry['data'], {'username': REDACTED, 'password': REDACTED, 'text': REDACTED})
+        self.assertEqual((entry['method'], entry['path'], entry['status']), ('POST', '/blog/login/', 302))
+
+    def test_passwords_are_redacted_when_values_are_kept(self) -> None:
+        entry: dict = self.record(keep_values=True)
+        self.assertEqual(entry['data'], {'username': 'reader', 'password': REDACTED, 'text': 'hello'})
+
+
+class TraceReplayTests(LiveServerTestCase):
+    """
+    Records a visit with the trace recorder and replays it against a live server.
+    """
+
+    def setUp(self) -> None:
+        patcher = mock.patch.object(hashing_pool, '_reporter', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        User.objects.create_user(username='reader', password='secret')
+        self.post: Post = Post.objects.create(title='Replayed')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path: str = os.path.join(directory.name, 'trace.jsonl')
+
+    def test_recorded_trace_replays(self) -> None:
+        comment_url: str = f'/blog/post/{self.post.slug}/comment/'
+        with override_settings(BLOG_TRACE_FILE=self.path), \
+                modify_settings(MIDDLEWARE={'prepend': 'blog.middleware.TraceRecorderMiddleware'}):
+            self.client.get('/blog/login/')
+            self.client.post('/blog/login/', {'username': 'reader', 'password': 'secret'})
+            self.client.post(comment_url, {'text': 'recorded'})
+        trace: List[dict] = read_trace(self.path)
+        self.assertEqual([entry['status'] for entry in trace], [200, 302, 302])
+        self.assertEqual(trace[1]['data'], {'username': REDACTED, 'password': REDACTED})
+
+        report: LoadReport = replay(trace, self.live_server_url, concurrency=2, password='secret', username='reader')
+        self.assertEqual(report.summary()['statuses'], {200: 1, 302: 2})
+        self.assertEqual(report.summary('add_comment')['requests'], 1)
+        self.assertEqual(
+            sorted(Comment.objects.filter(post=self.post).values_list('text', flat=True)), [FILLER, 'recorded'])
+
+
+class StaticHandlerTests(TestCase):
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.static: str = os.path.join(directory.name, 'static')
+        self.media: str = os.path.join(directory.name, 'media')
+        os.makedirs(self.static)
+        os.makedirs(self.media)
+        for path in (os.path.join(self.static, 'app.0123456789ab.css'),
+                     os.path.join(self.static, 'app.0123456789ab.css.gz'),
+                     os.path.join(self.media, 'photo.0123456789ab.png')):
+            with open(path, 'wb') as file:
+                file.write(b'body{}')
+        self.handler = PrecompressedStaticHandler(
+            lambda environ, start_response: [], [('/static/', self.static, True), ('/images/', self.media, False)])
+
+    def get(self, path: str, accept_encoding: str = '') -> dict:
+        result: dict = {}
+
+        def start_response(status: str, headers: list) -> None:
+            result.update(headers)
+
+        self.handler({'PATH_INFO': path, 'REQUEST_METHOD': 'GET', 'HTTP_ACCEPT_ENCODING': accept_encoding},
+                     start_response)
+        return result
+
+    def test_parse_accept_encoding(self) -> None:
+        self.assertEqual(parse_accept_encoding('gzip;q=0.5, br, *;q=0'), {'gzip': 0.5, 'br': 1.0, '*': 0.0})
+
+    def test_encoding_respects_quality(self) -> None:
+        css: str = '/static/app.0123456789ab.css'
+        self.assertEqual(self.get(css, 'gzip').get('Content-Encoding'), 'gzip')
+        self.assertEqual(self.get(css, '*').get('Content-Encoding'), 'gzip')
+        self.assertIsNone(self.get(css, 'gzip;q=0').get('Content-Encoding'))
+        self.assertIsNone(self.get(css, 'identity').get('Content-Encoding'))
+
+    def test_only_static_files_are_immutable(self) -> None:
+        self.assertIn('immutable', self.get('/static/app.0123456789ab.css')['Cache-Control'])
+        self.assertNotIn('immutable', self.get('/images/photo.0123456789ab.png')['Cache-Control'])
@@ -0,0 +1,74 @@
+import time
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpRequest
+
+
+class TokenBucket:
+    """
+    A token bucket rate limiter whose state lives in the Django cache.
+
+    Every client gets `capacity` tokens which refill at `rate` tokens per second.
+    The read-modify-write is not atomic, so concurrent requests of a single
+    client can occasionally slip through, which is acceptable for throttling.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (int): The maximum number of tokens, i.e. the allowed burst.
+        prefix (str): The prefix of the cache keys.
+        cache_alias (str): The cache holding the buckets.
+    """
+
+    def __init__(self, rate: float, capacity: int, prefix: str, cache_alias: str = 'default') -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.prefix = prefix
+        self.cache_alias = cache_alias
+
+    def consume(self, key: str, tokens: int = 1) -> bool:
+        """
+        Takes tokens from the bucket of a client.
+        Returns False if the client has run out of tokens.
+        """
+        cache = caches[self.cache_alias]
+        cache_key: str = f'throttle:{self.prefix}:{key}'
+        now: float = time.time()
+
+        state: Optional[Tuple[float, float]] = cache.get(cache_key)
+        if state is None:
+            available: float = self.capacity
+        else:
+            stored, updated_at = state
+            available = min(self.capacity, stored + (now - updated_at) * self.rate)
+
+        allowed: bool = available >= tokens
+        if allowed:
+            available -= tokens
+
+        # Keep the bucket until it would have refilled completely.
+        timeout: Optional[int] = int(self.capacity / self.rate) + 1 if self.rate else None
+        cache.set(cache_key, (available, now), timeout)
+        return allowed
+
+
+def client_key(request: HttpRequest) -> str:
+    """
+    Returns the throttling key of a request: the user for logged in users,
+    the IP address otherwise.
+    """
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{request.META.get("REMOTE_ADDR", "")}'
+
+
+def comment_bucket() -> TokenBucket:
+    """
+    Returns the token bucket limiting how often a client may comment.
+    """
+    return TokenBucket(
+        rate=settings.BLOG_COMMENT_RATE / 60,
+        capacity=settings.BLOG_COMMENT_BURST,
+        prefix='comment',
+    )
@@ -1,5 +1,25 @@
 from django.urls import path
-from .views import *
+from .views import (
+    authentification,
+    RegisterUser,
+    LoginUser,
+    logout_confirm,
+    logout_user,
+    posts_list,
+    posts_feed,
+    tag_feed,
+    sitemap_xml,
+    PostDetail,
+    PostCreate,
+    PostUpdate,
+    PostDelete,
+    tags_list,
+    TagDetail,
+    TagCreate,
+    TagUpdate,
+    TagDelete,
+)
+from . import api
 
 
 urlpatterns = [
@@ -8,12 +28,19 @@ urlpatterns = [
     path('post/<str:slug>/', PostDetail.as_view(), name='post_detail_url'),
     path('post/<str:slug>/update', PostUpdate.as_view(), name='post_update_url'),
     path('post/<str:slug>/delete', PostDelete.as_view(), name='post_delete_url'),
-    path('post/<slug:slug>/comment/', PostDetail.as_view(), name='add_comment'),
+    path('post/<str:slug>/comment/', PostDetail.as_view(), name='add_comment'),
+    path('feed/<str:feed_type>/', posts_feed, name='posts_feed_url'),
+    path('sitemap.xml', sitemap_xml, name='sitemap_url'),
     path('tags/', tags_list, name='tags_list_url'),
     path('tag/create', TagCreate.as_view(), name='tag_create_url'),
     path('tag/<str:slug>/', TagDetail.as_view(), name='tag_detail_url'),
+    path('tag/<str:slug>/feed/<str:feed_type>/', tag_feed, name='tag_feed_url'),
     path('tag/<str:slug>/update', TagUpdate.as_view(), name='tag_update_url'),
     path('tag/<str:slug>/delete', TagDelete.as_view(), name='tag_delete_url'),
+    path('api/posts/', api.posts_list, name='api_posts_url'),
+    path('api/posts/<str:slug>/', api.post_detail, name='api_post_detail_url'),
+    path('api/posts/<str:slug>/comments/', api.comments_list, name='api_comments_url'),
+    path('api/tags/', api.tags_list, name='api_tags_url'),
     path('authentification/', authentification, name='authentification_url'),
     path('register/', RegisterUser.as_view(), name='registration_url'),
     path('login/', LoginUser.as_view(), name='login_url'),
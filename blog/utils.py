@@ -1,11 +1,10 @@
 from django.shortcuts import render
 from django.shortcuts import get_object_or_404
 from django.shortcuts import redirect
+from django.shortcuts import reverse
 from typing import Type, Any
 from django.http import HttpRequest, HttpResponse
 
-from .models import *
-
 
 class ObjectDetailMixin:
     """
@@ -51,7 +50,8 @@ class ObjectCreateMixin:
         bound_form: Any = self.form_model(request.POST, request.FILES)
         if bound_form.is_valid():
             new_obj = bound_form.save()
-            return redirect(new_obj)
+            if new_obj is not None:
+                return redirect(new_obj)
         return render(request, self.template, context={'form': bound_form})
 
 
@@ -83,11 +83,12 @@ class ObjectUpdateMixin:
         A response containing the mapping of an object using a template.
         """
         obj: Any = self.model.objects.get(slug__iexact=slug)
-        bound_form: Any = self.form_model(request.POST, instance=obj)
+        bound_form: Any = self.form_model(request.POST, request.FILES, instance=obj)
 
         if bound_form.is_valid():
             new_obj: Any = bound_form.save()
-            return redirect(new_obj)
+            if new_obj is not None:
+                return redirect(new_obj)
         return render(
             request, self.template,
             context={'form': bound_form, self.model.__name__.lower(): obj}
@@ -116,7 +117,8 @@ class ObjectDeleteMixin:
     def post(self, request: HttpRequest, slug: str) -> HttpResponse:
         """
         Delete the object and redirect to the specified URL.
+        Related rows are deleted with set-based SQL instead of the collector.
         """
         obj: Any = self.model.objects.get(slug__iexact=slug)
-        obj.delete()
+        self.model.objects.filter(pk=obj.pk).bulk_delete()
         return redirect(reverse(self.redirect_url))
@@ -0,0 +1,129 @@
+"""
+View counts and a decayed popularity score, written in batches.
+
+Every read of a post would otherwise be a write to the database. Hits are
+counted in memory instead, and a background thread adds them to the posts
+with one `bulk_update` per flush. Both counters are computed by the
+database from the stored values, so flushes of several worker processes
+never overwrite each other.
+
+The popularity of a post is the sum of its views, each weighted by
+2 ** ((t - EPOCH) / half_life), so a view is worth half as much as one a
+half-life later. Decaying every score at the same rate would not change
+their order, so stored scores are never rewritten, only increased when
+views are added. The sum is kept as its base 2 logarithm, which stays
+small, and posts are ordered by it through an index.
+"""
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+from math import log2
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.expressions import Combinable
+from django.db.models.functions import Greatest, Least, Log, Power
+from django.utils import timezone
+
+from .background import BackgroundFlusher
+from .models import Post
+
+
+logger = logging.getLogger(__name__)
+
+EPOCH: datetime = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def view_weight(views: int, at: datetime) -> float:
+    """
+    Returns the base 2 logarithm of the weight of `views` views at the given time.
+    """
+    exponent: float = (at - EPOCH).total_seconds() / 3600 / settings.BLOG_TRENDING_HALF_LIFE
+    return exponent + log2(views)
+
+
+def add_views(popularity: float, views: int, at: datetime) -> float:
+    """
+    Returns the popularity score after `views` more views at the given time.
+    """
+    added: float = view_weight(views, at)
+    if not popularity:
+        return added
+    high, low = max(popularity, added), min(popularity, added)
+    return high + log2(1 + 2 ** (low - high))
+
+
+def add_views_expression(views: int, at: datetime) -> Combinable:
+    """
+    Returns `add_views` as an SQL expression over the stored popularity.
+    """
+    added = Value(view_weight(views, at), output_field=FloatField())
+    high = Greatest(F('popularity'), added)
+    low = Least(F('popularity'), added)
+    return Case(
+        When(popularity=0, then=added),
+        default=high + Log(2, Value(1.0) + Power(2, low - high)),
+        output_field=FloatField(),
+    )
+
+
+class ViewCounter:
+    """
+    Counts post views in memory and adds them to the database in batches.
+
+    Views counted by a worker process are lost if it is killed before the
+    next flush; a flush is attempted when the process exits normally.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: Counter = Counter()
+        self._flusher = BackgroundFlusher(
+            self.flush, settings.BLOG_VIEW_FLUSH_INTERVAL, name='view-counter')
+
+    def hit(self, post_id: int) -> None:
+        """
+        Counts one view of a post.
+        """
+        with self._lock:
+            self._pending[post_id] += 1
+        self._flusher.start()
+
+    def flush(self) -> int:
+        """
+        Adds the counted views to the posts and returns how many posts were updated.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+        if not batch:
+            return 0
+
+        now: datetime = timezone.now()
+        posts: List[Post] = [
+            Post(pk=post_id, views=F('views') + views, popularity=add_views_expression(views, now))
+            for post_id, views in batch.items()
+        ]
+        try:
+            with transaction.atomic():
+                # Posts deleted since their views were counted are skipped.
+                updated: int = Post.objects.bulk_update(posts, ['views', 'popularity'])
+        except OperationalError:
+            # The database is locked or unavailable: retry with the next batch.
+            with self._lock:
+                self._pending.update(batch)
+            raise
+        logger.debug('Flushed views of %d posts', updated)
+        return updated
+
+    def pending(self) -> Dict[int, int]:
+        """
+        Returns the views that have not been written yet, by post id.
+        """
+        with self._lock:
+            return dict(self._pending)
+
+
+view_counter = ViewCounter()
@@ -1,7 +1,7 @@
 from django.http import HttpRequest, HttpResponse
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import patch_cache_control
 from django.views.generic import View
-from django.db.models import Q
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView
@@ -11,10 +11,18 @@ from django.views.generic.edit import CreateView
 
 from django.core.paginator import Paginator, Page, EmptyPage
 
-from .models import Post, Tag
-from .utils import *
+from .models import Comment, Post, Tag
+from .utils import ObjectCreateMixin, ObjectDeleteMixin, ObjectDetailMixin, ObjectUpdateMixin
 from .forms import TagForm, PostForm, RegistrationForm, LoginForm, CommentForm
+from .comment_queue import comment_queue
+from .view_counter import view_counter
+from .throttling import client_key, comment_bucket
+from .caching import (
+    POSTS_FEED_FAMILY, SITEMAP_FAMILY, cached_page, is_warming_request, serve_cached_document, tag_feed_family,
+)
+from django.http import Http404
 from django.contrib import messages
+from django.conf import settings
 from typing import List, Type, Any, Union
 
 
@@ -81,21 +89,32 @@ def logout_user(request: HttpRequest) -> HttpResponse:
 
 
 def posts_list(request: HttpRequest) -> HttpResponse:
+    """
+    Serves the list of posts, from the page cache unless searching.
+    """
+    if request.GET.get('search'):
+        return render_posts_list(request)
+    trending: bool = request.GET.get('order') == 'trending'
+    variant: str = f'page={request.GET.get("page", "1")}&trending={trending}'
+    return cached_page(request, lambda: render_posts_list(request), variant)
+
+
+def render_posts_list(request: HttpRequest) -> HttpResponse:
     """
     Renders a paginated list of all the posts in the database.
-    The posts are ordered by the date created, newest first.
+    The posts are ordered by the date created, newest first,
+    or by popularity with `?order=trending`.
 
     Returns HTTP response object, containing the rendered template.
     """
     search_query: str = request.GET.get('search', '')
+    trending: bool = request.GET.get('order') == 'trending'
 
+    posts: List[Post] = Post.objects.for_feed()
     if search_query:
-        posts: List[Post] = Post.objects.filter(
-            Q(title__icontains=search_query) |
-            Q(body__icontains=search_query)
-        )
-    else:
-        posts: List[Post] = Post.objects.all()
+        posts = posts.search(search_query)
+    if trending:
+        posts = posts.trending()
 
     paginator: Paginator = Paginator(posts, 6)
 
@@ -104,13 +123,15 @@ def posts_list(request: HttpRequest) -> HttpResponse:
 
     is_paginated: bool = page.has_other_pages()
 
+    order_query: str = '&order=trending' if trending else ''
+
     if page.has_previous():
-        prev_url: str = f'?page={page.previous_page_number()}'
+        prev_url: str = f'?page={page.previous_page_number()}{order_query}'
     else:
         prev_url: str = ''
 
     if page.has_next():
-        next_url: str = f'?page={page.next_page_number()}'
+        next_url: str = f'?page={page.next_page_number()}{order_query}'
     else:
         next_url: str = ''
 
@@ -118,9 +139,52 @@ def posts_list(request: HttpRequest) -> HttpResponse:
         'page_object': page,
         'is_paginated': is_paginated,
         'next_url': next_url,
-        'prev_url': prev_url
+        'prev_url': prev_url,
+        'trending': trending,
+        'most_read': Post.objects.for_feed().most_read(),
     }
-    return render(request, 'blog/index.html', context=context)
+    response: HttpResponse = render(request, 'blog/index.html', context=context)
+    if str(request.GET.get('page', '1')) != str(page.number):
+        # Invalid and out of range page numbers show another page, keep them out of the page cache.
+        patch_cache_control(response, private=True)
+    return response
+
+
+def posts_feed(request: HttpRequest, feed_type: str) -> HttpResponse:
+    """
+    Serves the cached RSS or Atom feed of the newest posts.
+    """
+    # Feeds are rarely requested, so the syndication framework is loaded on first use.
+    from .feeds import FEEDS
+
+    if feed_type not in FEEDS:
+        raise Http404
+    return serve_cached_document(
+        request, POSTS_FEED_FAMILY, feed_type, lambda: FEEDS[feed_type](request))
+
+
+def tag_feed(request: HttpRequest, slug: str, feed_type: str) -> HttpResponse:
+    """
+    Serves the cached RSS or Atom feed of the newest posts with a tag.
+    """
+    from .feeds import TAG_FEEDS
+
+    if feed_type not in TAG_FEEDS:
+        raise Http404
+    return serve_cached_document(
+        request, tag_feed_family(slug), feed_type, lambda: TAG_FEEDS[feed_type](request, slug=slug))
+
+
+def sitemap_xml(request: HttpRequest) -> HttpResponse:
+    """
+    Serves the cached sitemap of all posts and tags.
+    """
+    from django.contrib.sitemaps.views import sitemap
+    from .sitemaps import SITEMAPS
+
+    page: str = request.GET.get('p', '1')
+    return serve_cached_document(
+        request, SITEMAP_FAMILY, page, lambda: sitemap(request, sitemaps=SITEMAPS))
 
 
 class PostDetail(View):
@@ -130,45 +194,67 @@ class PostDetail(View):
     model: Type[Any] = Post
     template: str = 'blog/post_detail.html'
 
-    def get(self, request: Any, slug: str) -> Any:
+    def get_context(self, request: Any, post: Any, form: Any) -> dict:
         """
-        Gets an object and renders it using a template.
-        A response containing the mapping of an object using a template.
+        Returns the template context, including the comments of the current user
+        that are still waiting to be written.
         """
-        post: Any = get_object_or_404(self.model, slug__iexact=slug)
-        comments: Any = Comment.objects.filter(post=post)
-        form: Any = CommentForm()
-        context: dict = {
+        comments: List[Any] = list(
+            Comment.objects.filter(post=post).select_related('author'))
+        if request.user.is_authenticated and settings.BLOG_COMMENT_WRITE_BEHIND:
+            comments += comment_queue.pending_for(post.pk, request.user.pk)
+        return {
             self.model.__name__.lower(): post,
             'admin_object': post,
             'detail': True,
             'comments': comments,
+            'related_posts': Post.objects.for_feed().related_to(post)[:settings.BLOG_RELATED_POSTS],
             'form': form,
         }
-        return render(request, self.template, context)
+
+    def get(self, request: Any, slug: str) -> Any:
+        """
+        Gets an object and renders it using a template, or serves the cached
+        page to anonymous visitors. Views are counted either way.
+        """
+        response: HttpResponse = cached_page(request, lambda: self.render_detail(request, slug))
+        if not is_warming_request(request):
+            view_counter.hit(response.page_meta['post_id'])
+        return response
+
+    def render_detail(self, request: Any, slug: str) -> HttpResponse:
+        """
+        A response containing the mapping of an object using a template.
+        """
+        post: Any = get_object_or_404(self.model.objects.defer('body'), slug__iexact=slug)
+        form: Any = CommentForm()
+        response: HttpResponse = render(request, self.template, self.get_context(request, post, form))
+        response.page_meta = {'post_id': post.pk}
+        return response
 
     def post(self, request: Any, slug: str) -> Any:
         """
         Handles POST requests for adding comments to an object.
+        Comments are rate limited per user or IP address and, in write-behind mode,
+        queued and written in batches.
         """
-        text: Any = get_object_or_404(self.model, slug__iexact=slug)
+        text: Any = get_object_or_404(self.model.objects.defer('body'), slug__iexact=slug)
         form: Any = CommentForm(request.POST)
-        if form.is_valid():
-            comment = form.save(commit=False)
-            comment.post = text
-            comment.author = request.user
-            comment.save()
-            return redirect('add_comment', slug=text.slug)
+        if not form.is_valid():
+            return render(request, self.template, self.get_context(request, text, form))
+
+        if not comment_bucket().consume(client_key(request)):
+            form.add_error(None, 'Слишком много комментариев. Попробуйте позже.')
+            return render(request, self.template, self.get_context(request, text, form), status=429)
+
+        comment = form.save(commit=False)
+        comment.post = text
+        comment.author = request.user
+        if settings.BLOG_COMMENT_WRITE_BEHIND:
+            comment_queue.submit(comment)
         else:
-            comments: Any = Comment.objects.filter(post=text)
-            context: dict = {
-                self.model.__name__.lower(): text,
-                'admin_object': text,
-                'detail': True,
-                'comments': comments,
-                'form': form,
-            }
-            return render(request, self.template, context)
+            comment.save()
+        return redirect('add_comment', slug=text.slug)
 
 
 class PostCreate(LoginRequiredMixin, ObjectCreateMixin, View):
@@ -206,7 +292,7 @@ def tags_list(request: HttpRequest) -> HttpResponse:
     A response containing a list of all the tags.
     """
     tags: List[Tag] = Tag.objects.all()
-    return render(request, 'blog/tags_list.html', context={'tags': tags})
+    return cached_page(request, lambda: render(request, 'blog/tags_list.html', context={'tags': tags}))
 
 
 class TagDetail(ObjectDetailMixin, View):
@@ -216,6 +302,9 @@ class TagDetail(ObjectDetailMixin, View):
     model: Type[Any] = Tag
     template: str = 'blog/tag_detail.html'
 
+    def get(self, request: Any, slug: str) -> Any:
+        return cached_page(request, lambda: super(TagDetail, self).get(request, slug))
+
 
 class TagCreate(LoginRequiredMixin, ObjectCreateMixin, View):
     """
@@ -15,12 +15,12 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
-# Load the .env file
-load_dotenv()
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Load the .env file from the project root, without searching parent directories
+load_dotenv(BASE_DIR / '.env')
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
 
@@ -41,19 +41,32 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.sitemaps',
     'blog.apps.BlogConfig',
 ]
 
+# Skip saving sessions whose data did not change during the request
+BLOG_SESSION_IDLE_WRITES = os.environ.get('BLOG_SESSION_IDLE_WRITES', 'True') == 'True'
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'blog.middleware.IdleWriteSessionMiddleware' if BLOG_SESSION_IDLE_WRITES
+    else 'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'blog.middleware.HashingPoolBusyMiddleware',
 ]
 
+# Record every request to this JSONL file for `manage.py loadtest`. Form values are
+# redacted unless BLOG_TRACE_FORM_VALUES is True; passwords always are
+BLOG_TRACE_FILE = os.environ.get('BLOG_TRACE_FILE', '')
+BLOG_TRACE_FORM_VALUES = os.environ.get('BLOG_TRACE_FORM_VALUES') == 'True'
+if BLOG_TRACE_FILE:
+    MIDDLEWARE.insert(0, 'blog.middleware.TraceRecorderMiddleware')
+
 ROOT_URLCONF = 'blog_engine.urls'
 
 TEMPLATES = [
@@ -84,6 +97,39 @@ DATABASES = {
     }
 }
 
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# The default cache holds pages, feeds and counters. Local memory is private to
+# each process; set BLOG_CACHE_BACKEND and BLOG_CACHE_LOCATION to share it
+# between workers, e.g. django.core.cache.backends.redis.RedisCache
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('BLOG_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('BLOG_CACHE_LOCATION', 'blog-default'),
+    },
+    # Cache of the cache and cached_db session backends. Local memory only works with
+    # a single worker process; set BLOG_SESSION_CACHE_BACKEND and
+    # BLOG_SESSION_CACHE_LOCATION to a shared cache otherwise
+    'sessions': {
+        'BACKEND': os.environ.get('BLOG_SESSION_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('BLOG_SESSION_CACHE_LOCATION', 'blog-sessions'),
+    },
+}
+
+# Sessions: 'db', 'cached_db', 'cache' or 'signed_cookies'
+# https://docs.djangoproject.com/en/4.2/topics/http/sessions/#configuring-the-session-engine
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('BLOG_SESSION_BACKEND', 'db')]
+SESSION_CACHE_ALIAS = 'sessions'
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -102,6 +148,55 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing profile: 'scrypt', 'argon2' (needs argon2-cffi) or 'pbkdf2'.
+# Passwords stored with another profile are rehashed on the next login.
+BLOG_PASSWORD_PROFILE = os.environ.get('BLOG_PASSWORD_PROFILE', 'scrypt')
+
+PASSWORD_PROFILES = {
+    'scrypt': 'blog.hashers.PooledScryptPasswordHasher',
+    'argon2': 'blog.hashers.PooledArgon2PasswordHasher',
+    'pbkdf2': 'blog.hashers.PooledPBKDF2PasswordHasher',
+}
+
+PASSWORD_HASHERS = [PASSWORD_PROFILES[BLOG_PASSWORD_PROFILE]] + [
+    hasher for profile, hasher in PASSWORD_PROFILES.items() if profile != BLOG_PASSWORD_PROFILE
+]
+
+BLOG_PBKDF2_ITERATIONS = int(os.environ.get('BLOG_PBKDF2_ITERATIONS', 600000))
+BLOG_SCRYPT_WORK_FACTOR = int(os.environ.get('BLOG_SCRYPT_WORK_FACTOR', 2 ** 14))
+BLOG_SCRYPT_BLOCK_SIZE = int(os.environ.get('BLOG_SCRYPT_BLOCK_SIZE', 8))
+BLOG_ARGON2_TIME_COST = int(os.environ.get('BLOG_ARGON2_TIME_COST', 2))
+BLOG_ARGON2_MEMORY_COST = int(os.environ.get('BLOG_ARGON2_MEMORY_COST', 65536))
+BLOG_ARGON2_PARALLELISM = int(os.environ.get('BLOG_ARGON2_PARALLELISM', 1))
+
+# Password hashing runs on a pool of BLOG_HASHING_WORKERS threads with at most
+# BLOG_HASHING_QUEUE_SIZE waiting jobs; others get 503 after the timeout
+BLOG_HASHING_WORKERS = int(os.environ.get('BLOG_HASHING_WORKERS', 2))
+BLOG_HASHING_QUEUE_SIZE = int(os.environ.get('BLOG_HASHING_QUEUE_SIZE', 8))
+BLOG_HASHING_QUEUE_TIMEOUT = float(os.environ.get('BLOG_HASHING_QUEUE_TIMEOUT', 2.0))
+# Jobs and queue times of the pool are logged this often while it is in use; 0 disables
+BLOG_HASHING_STATS_INTERVAL = float(os.environ.get('BLOG_HASHING_STATS_INTERVAL', 60.0))
+
+# Logging
+# https://docs.djangoproject.com/en/4.2/topics/logging/
+
+# Messages of the blog app, such as password hashing queue times, go to stderr
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'blog': {
+            'handlers': ['console'],
+            'level': os.environ.get('BLOG_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.1/topics/i18n/
 
@@ -120,11 +215,60 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'static/'
 ]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Cache lifetime for static and media files without a content hash
+STATIC_MAX_AGE = int(os.environ.get('DJANGO_STATIC_MAX_AGE', 3600))
+
+# collectstatic fingerprints, minifies and precompresses static files. The manifest
+# storage needs collectstatic to have run, so it is off by default with DEBUG
+STATIC_MANIFEST = os.environ.get('DJANGO_STATIC_MANIFEST', str(not DEBUG)) == 'True'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'blog_engine.storage.CompressedManifestStaticFilesStorage' if STATIC_MANIFEST
+        else 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
 
 # Base url to serve media files
 MEDIA_URL = '/images/'
 MEDIA_ROOT = BASE_DIR / 'static/'
 
+# Comments: a token bucket per user or IP refilled at BLOG_COMMENT_RATE comments
+# per minute, allowing bursts of BLOG_COMMENT_BURST comments
+BLOG_COMMENT_RATE = float(os.environ.get('BLOG_COMMENT_RATE', 6))
+BLOG_COMMENT_BURST = int(os.environ.get('BLOG_COMMENT_BURST', 3))
+
+# Queue comments in memory and write them in batches from a background thread
+BLOG_COMMENT_WRITE_BEHIND = os.environ.get('BLOG_COMMENT_WRITE_BEHIND') == 'True'
+BLOG_COMMENT_BATCH_SIZE = int(os.environ.get('BLOG_COMMENT_BATCH_SIZE', 100))
+BLOG_COMMENT_FLUSH_INTERVAL = float(os.environ.get('BLOG_COMMENT_FLUSH_INTERVAL', 1.0))
+
+# Feeds and sitemaps are served from pre-generated documents kept in the cache
+BLOG_FEED_SIZE = int(os.environ.get('BLOG_FEED_SIZE', 20))
+BLOG_DOCUMENT_CACHE_TIMEOUT = int(os.environ.get('BLOG_DOCUMENT_CACHE_TIMEOUT', 24 * 60 * 60))
+BLOG_DOCUMENT_MAX_AGE = int(os.environ.get('BLOG_DOCUMENT_MAX_AGE', 300))
+
+# Pages shown to anonymous visitors are cached until content changes, but at most
+# BLOG_PAGE_CACHE_TIMEOUT seconds, which also bounds how stale view counts get; 0 disables
+BLOG_PAGE_CACHE_TIMEOUT = int(os.environ.get('BLOG_PAGE_CACHE_TIMEOUT', 300))
+
+# Bulk deletes and merges run in batches of this many rows
+BLOG_BULK_BATCH_SIZE = int(os.environ.get('BLOG_BULK_BATCH_SIZE', 1000))
+
+# Number of related posts shown under a post
+BLOG_RELATED_POSTS = int(os.environ.get('BLOG_RELATED_POSTS', 4))
+
+# Post views are counted in memory and written every BLOG_VIEW_FLUSH_INTERVAL seconds,
+# the trending score halves every BLOG_TRENDING_HALF_LIFE hours
+BLOG_VIEW_FLUSH_INTERVAL = float(os.environ.get('BLOG_VIEW_FLUSH_INTERVAL', 10.0))
+BLOG_TRENDING_HALF_LIFE = float(os.environ.get('BLOG_TRENDING_HALF_LIFE', 24.0))
+BLOG_MOST_READ = int(os.environ.get('BLOG_MOST_READ', 5))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
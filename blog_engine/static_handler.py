@@ -0,0 +1,160 @@
+"""
+WSGI wrapper that serves collected static files and uploaded media
+without going through Django's middleware and view stack.
+
+Precompressed ``.br``/``.gz`` siblings written by ``collectstatic`` are
+picked according to ``Accept-Encoding``, fingerprinted files get far-future
+cache headers, and file bodies are handed to the server's
+``wsgi.file_wrapper`` so that servers supporting it can use ``sendfile``.
+"""
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+
+
+# Matches the 12 hex digit fingerprint added by ManifestStaticFilesStorage.
+# Only collected static files carry one; uploaded media never does.
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+IMMUTABLE_CACHE_CONTROL: str = 'public, max-age=31536000, immutable'
+
+ENCODINGS: Tuple[Tuple[str, str], ...] = (('br', '.br'), ('gzip', '.gz'))
+
+BLOCK_SIZE: int = 64 * 1024
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """
+    Returns the quality value of every coding listed in an Accept-Encoding header.
+
+    Codings without a ``q`` parameter get 1.0, malformed values get 0.
+    """
+    qualities: Dict[str, float] = {}
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        quality: float = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities
+
+
+def accepts_encoding(qualities: Dict[str, float], encoding: str) -> bool:
+    """
+    Tells whether a coding is acceptable, falling back to ``*`` when it is not listed.
+    """
+    return qualities.get(encoding, qualities.get('*', 0.0)) > 0
+
+
+class PrecompressedStaticHandler:
+    """
+    Serves files below the given URL prefixes and passes everything else on.
+
+    Attributes:
+        application (Callable): The wrapped WSGI application.
+        mounts (List[Tuple[str, str, bool]]): URL prefixes, the directories they map to
+            and whether the files there are fingerprinted by collectstatic.
+        max_age (int): Cache lifetime in seconds for files without a fingerprint.
+    """
+
+    def __init__(self, application: Callable, mounts: List[Tuple[str, str, bool]], max_age: int = 3600) -> None:
+        self.application = application
+        self.mounts = [
+            (prefix, os.path.realpath(root), fingerprinted)
+            for prefix, root, fingerprinted in mounts if prefix and root
+        ]
+        self.max_age = max_age
+
+    @classmethod
+    def from_settings(cls, application: Callable) -> 'PrecompressedStaticHandler':
+        """
+        Builds a handler for STATIC_ROOT and MEDIA_ROOT.
+        """
+        mounts = [
+            (settings.STATIC_URL, str(settings.STATIC_ROOT), True),
+            (settings.MEDIA_URL, str(settings.MEDIA_ROOT), False),
+        ]
+        return cls(application, mounts, max_age=getattr(settings, 'STATIC_MAX_AGE', 3600))
+
+    def __call__(self, environ: dict, start_response: Callable) -> Iterable[bytes]:
+        path: str = environ.get('PATH_INFO', '')
+        for prefix, root, fingerprinted in self.mounts:
+            if path.startswith(prefix):
+                return self.serve(environ, start_response, root, path[len(prefix):], fingerprinted)
+        return self.application(environ, start_response)
+
+    def resolve(self, root: str, name: str) -> Optional[str]:
+        """
+        Returns the absolute path of a file inside root, or None.
+        """
+        path: str = os.path.realpath(os.path.join(root, name))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def serve(self, environ: dict, start_response: Callable, root: str, name: str,
+              fingerprinted: bool = False) -> Iterable[bytes]:
+        """
+        Serves a single file with caching and content negotiation headers.
+
+        Files are cached as immutable only below a fingerprinted root, so an
+        upload named like a hashed file still gets the short lifetime.
+        """
+        method: str = environ.get('REQUEST_METHOD', 'GET')
+        if method not in ('GET', 'HEAD'):
+            start_response('405 Method Not Allowed', [('Allow', 'GET, HEAD'), ('Content-Length', '0')])
+            return []
+
+        path = self.resolve(root, name)
+        if path is None:
+            start_response('404 Not Found', [('Content-Type', 'text/plain'), ('Content-Length', '9')])
+            return [b'Not Found']
+
+        content_type, _ = mimetypes.guess_type(path)
+        headers: List[Tuple[str, str]] = [('Content-Type', content_type or 'application/octet-stream')]
+
+        accepted: Dict[str, float] = parse_accept_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        has_variants: bool = False
+        served_path: str = path
+        for encoding, suffix in ENCODINGS:
+            if not os.path.isfile(path + suffix):
+                continue
+            has_variants = True
+            if served_path == path and accepts_encoding(accepted, encoding):
+                served_path = path + suffix
+                headers.append(('Content-Encoding', encoding))
+        if has_variants:
+            headers.append(('Vary', 'Accept-Encoding'))
+
+        stat = os.stat(served_path)
+        etag: str = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        if fingerprinted and HASHED_NAME.search(name):
+            headers.append(('Cache-Control', IMMUTABLE_CACHE_CONTROL))
+        else:
+            headers.append(('Cache-Control', f'public, max-age={self.max_age}'))
+        headers.append(('ETag', etag))
+        headers.append(('Last-Modified', formatdate(stat.st_mtime, usegmt=True)))
+
+        if environ.get('HTTP_IF_NONE_MATCH') == etag:
+            start_response('304 Not Modified', [h for h in headers if h[0] != 'Content-Type'])
+            return []
+
+        headers.append(('Content-Length', str(stat.st_size)))
+        start_response('200 OK', headers)
+        if method == 'HEAD':
+            return []
+
+        file_wrapper: Any = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(served_path, 'rb'), BLOCK_SIZE)
@@ -0,0 +1,120 @@
+"""
+Static files storage used by ``collectstatic``.
+
+Files are fingerprinted by ``ManifestStaticFilesStorage``, stylesheets are
+minified before hashing, and every compressible file gets precompressed
+``.gz`` and (when the ``brotli`` package is installed) ``.br`` siblings
+that the production static handler serves directly.
+"""
+import gzip
+import os
+import re
+from typing import Any, Iterator, Tuple
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+
+# Formats that are already compressed and do not shrink any further.
+UNCOMPRESSIBLE_EXTENSIONS: Tuple[str, ...] = (
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.ico',
+    '.woff', '.woff2', '.zip', '.gz', '.br',
+)
+
+# Strings are kept verbatim, comments are dropped.
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def _squeeze_css(chunk: str) -> str:
+    """
+    Collapses whitespace in a piece of CSS that contains no strings or comments.
+    """
+    chunk = _CSS_SPACE.sub(' ', chunk)
+    chunk = _CSS_PUNCTUATION.sub(r'\1', chunk)
+    return chunk.replace(': ', ':').replace(';}', '}')
+
+
+def minify_css(source: str) -> str:
+    """
+    Returns a minified copy of a stylesheet.
+    """
+    parts = []
+    pending = ''
+    position = 0
+    for match in _CSS_TOKENS.finditer(source):
+        pending += source[position:match.start()]
+        if match.group(1):
+            parts.append(_squeeze_css(pending))
+            parts.append(match.group(1))
+            pending = ''
+        position = match.end()
+    parts.append(_squeeze_css(pending + source[position:]))
+    return ''.join(parts).strip()
+
+
+def brotli_compress(data: bytes) -> Any:
+    """
+    Compresses data with brotli, or returns None if brotli is not installed.
+    """
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage that minifies CSS and writes precompressed siblings.
+    """
+    # Only keep a compressed copy if it saves at least this share of the size.
+    min_compression_ratio: float = 0.95
+
+    def _save(self, name: str, content: Any) -> str:
+        """
+        Minifies stylesheets before they are written and hashed.
+        """
+        if name.endswith('.css'):
+            content.seek(0)
+            source: str = content.read().decode('utf-8')
+            content = ContentFile(minify_css(source).encode('utf-8'))
+        return super()._save(name, content)
+
+    def post_process(self, paths: dict, dry_run: bool = False, **options: Any) -> Iterator[Any]:
+        """
+        Hashes the collected files and then precompresses every stored copy.
+        """
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if self.exists(name):
+                self.compress(name)
+
+    def compress(self, name: str) -> None:
+        """
+        Writes ``.gz`` and ``.br`` siblings of a stored file.
+        """
+        if name.lower().endswith(UNCOMPRESSIBLE_EXTENSIONS):
+            return
+
+        path: str = self.path(name)
+        with open(path, 'rb') as source:
+            data: bytes = source.read()
+        if not data:
+            return
+
+        variants = (
+            ('.gz', gzip.compress(data, compresslevel=9, mtime=0)),
+            ('.br', brotli_compress(data)),
+        )
+        for suffix, compressed in variants:
+            if compressed is None or len(compressed) >= len(data) * self.min_compression_ratio:
+                continue
+            with open(path + suffix, 'wb') as target:
+                target.write(compressed)
+            os.utime(path + suffix, (os.path.getatime(path), os.path.getmtime(path)))
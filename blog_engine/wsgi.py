@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_engine.settings')
 
 application = get_wsgi_application()
+
+# Serve collected static files and media without Django's view stack
+if os.environ.get('DJANGO_SERVE_STATIC') == 'True':
+    from .static_handler import PrecompressedStaticHandler
+
+    application = PrecompressedStaticHandler.from_settings(application)